@@ -19,6 +19,8 @@ try:
     from .gh_rest import cleanup_github_processor, get_github_processor
     from .msg_req import cleanup_message_processor, get_message_processor
     from .og_img import cleanup_og_manager, get_og_manager
+    from .permission_manager import cleanup_permission_manager
+    from .prompt_engine import cleanup_prompt_manager
     from .qq_msg import cleanup_qq_handler, get_qq_handler
     from .utils import cleanup_utils, get_utils_instance
     from .webhook import cleanup_webhook_processor, get_webhook_processor
@@ -219,6 +221,7 @@ class WebhookBot:
                 cleanup_webhook_processor(),
                 cleanup_github_processor(),
                 cleanup_mcp_tools(),
+                cleanup_og_manager(),
             ]
             await asyncio.gather(*async_cleanup_tasks, return_exceptions=True)
             sync_cleanup_functions = [
@@ -226,9 +229,10 @@ class WebhookBot:
                 cleanup_qq_handler,
                 cleanup_message_processor,
                 cleanup_unified_ai_handler,
-                cleanup_og_manager,
                 cleanup_utils,
                 cleanup_config,
+                cleanup_permission_manager,
+                cleanup_prompt_manager,
             ]
             # 清理聚合器
             try:
@@ -4,9 +4,10 @@ ai数据类
 
 import json
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
+from functools import cached_property, lru_cache
 from pathlib import Path
 
 from loguru import logger
@@ -140,6 +141,29 @@ class ToolCall:
         )
 
 
+# 上下文摘要包含的最近消息数
+SUMMARY_MESSAGE_COUNT = 5
+# 摘要中的角色显示名
+_ROLE_NAMES = {"user": "用户", "assistant": "助手", "system": "系统"}
+
+
+def _format_summary(messages: List[Message]) -> str:
+    """格式化消息摘要"""
+    summary_parts = []
+    for msg in messages:
+        author_info = f"({msg.author})" if msg.author and msg.role == "user" else ""
+        role_name = _ROLE_NAMES.get(msg.role, msg.role)
+        content = msg.content[:100] + "..." if len(msg.content) > 100 else msg.content
+        summary_parts.append(f"{role_name}{author_info}: {content}")
+    return "\n".join(summary_parts)
+
+
+@lru_cache(maxsize=1024)
+def make_context_key(context_type_value: str, context_id: str) -> str:
+    """生成上下文配置键"""
+    return f"{context_type_value}_{context_id}"
+
+
 @dataclass
 class ConversationContext:
     """对话上下文"""
@@ -157,6 +181,16 @@ class ConversationContext:
     issue_or_pr_id: Optional[str] = None
     max_messages: int = 100
 
+    @cached_property
+    def context_type_value(self) -> str:
+        """上下文类型字符串值, 首次访问后缓存"""
+        return self.context_type.value
+
+    @cached_property
+    def cache_key(self) -> str:
+        """上下文配置键(类型_ID), 首次访问后缓存"""
+        return make_context_key(self.context_type_value, self.context_id)
+
     def add_message(self, message: Message):
         """添加消息到上下文"""
         self.messages.append(message)
@@ -179,17 +213,16 @@ class ConversationContext:
         """获取上下文摘要"""
         if not self.messages:
             return "暂无对话历史"
-
-        recent = self.get_recent_messages(5)
-        summary_parts = []
-
-        for msg in recent:
-            author_info = f"({msg.author})" if msg.author and msg.role == "user" else ""
-            role_name = {"user": "用户", "assistant": "助手", "system": "系统"}.get(msg.role, msg.role)
-            content = msg.content[:100] + "..." if len(msg.content) > 100 else msg.content
-            summary_parts.append(f"{role_name}{author_info}: {content}")
-
-        return "\n".join(summary_parts)
+        return _format_summary(self.get_recent_messages(SUMMARY_MESSAGE_COUNT))
+
+    def render_snapshot(self, recent_n: int = SUMMARY_MESSAGE_COUNT) -> Tuple[int, str, List[Message]]:
+        """一次取出渲染所需的消息数量、上下文摘要和最近消息"""
+        messages = self.messages
+        if not messages:
+            return 0, "暂无对话历史", []
+        recent = messages[-recent_n:]
+        summary_source = recent if recent_n == SUMMARY_MESSAGE_COUNT else messages[-SUMMARY_MESSAGE_COUNT:]
+        return len(messages), _format_summary(summary_source), recent
 
     def is_expired(self, max_age_hours: int = 24) -> bool:
         """检查上下文是否过期"""
@@ -25,6 +25,7 @@ DEFAULT_CONFIG = {
     "image_cache_days": 4,
     "cache_cleanup_interval": 24,
     "forward_threshold": 1,
+    "format_workers": 0,  # 消息格式化进程池大小, 0表示在事件循环内直接格式化
     "proxy": {"enabled": False, "url": "http://127.0.0.1:7897"},
     "debug_channel": {"enabled": True, "group_id": None},
     "star_milestones": {
@@ -90,6 +91,7 @@ class ConfigManager:
     def __init__(self):
         self._config = None
         self._observer = None
+        self._version = 0  # 配置版本号, 每次加载/保存后递增, 供下游缓存判断失效
         self._load_config()
         self._setup_file_watcher()
 
@@ -105,10 +107,12 @@ class ConfigManager:
                 self._config = DEFAULT_CONFIG.copy()
                 self.save_config(self._config)
                 logger.info("创建默认配置文件")
+            self._version += 1
             return self._config
         except Exception as e:
             logger.error(f"加载配置文件失败: {e}")
             self._config = DEFAULT_CONFIG.copy()
+            self._version += 1
             return self._config
 
     def _merge_config(self, default: Dict[str, Any], user: Dict[str, Any]) -> Dict[str, Any]:
@@ -140,6 +144,11 @@ class ConfigManager:
         except Exception as e:
             logger.warning(f"启动配置文件监听器失败: {e}")
 
+    @property
+    def version(self) -> int:
+        """配置版本号"""
+        return self._version
+
     def get_config(self) -> Dict[str, Any]:
         """获取完整配置"""
         return self._config.copy() if self._config else DEFAULT_CONFIG.copy()
@@ -188,6 +197,7 @@ class ConfigManager:
                 os.rename(temp_file, CONFIG_FILE)
 
                 self._config = config
+                self._version += 1
                 logger.info("配置文件保存成功")
                 return True
         except Exception as e:
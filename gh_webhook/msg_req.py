@@ -2,11 +2,17 @@
 通知处理
 """
 
+import asyncio
+import hashlib
 import json
-from dataclasses import dataclass
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
 
 from loguru import logger
 
@@ -56,7 +62,7 @@ class MessageType(Enum):
     AI_REVIEW = "ai_review"  # 我也不知道为什么出现
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageContent:
     """消息内容"""
 
@@ -134,12 +140,199 @@ EVENT_ICONS = {
     "ping": "🏓",
 }
 
+# 消息类型 -> 图标, 导入时解析一次, 分发时无需再访问Enum.value
+_MESSAGE_TYPE_ICONS = {
+    message_type: EVENT_ICONS.get(message_type.value, EVENT_ICONS["default"]) for message_type in MessageType
+}
+
+# 检查运行/工作流状态映射: (status, conclusion) -> (emoji, 文本)
+# 有conclusion时按conclusion查表, 否则按status查表
+_CHECK_RUN_STATE = {
+    ("", "success"): ("✅", "成功"),
+    ("", "failure"): ("❌", "失败"),
+    ("", "cancelled"): ("⏹️", "已取消"),
+    ("in_progress", ""): ("🔄", "运行中"),
+}
+
+# 检查套件状态映射
+_CHECK_SUITE_STATE = {
+    ("", "success"): ("✅", "成功"),
+    ("", "failure"): ("❌", "失败"),
+    ("in_progress", ""): ("🔄", "运行中"),
+}
+
+
+def _check_state_key(status: Optional[str], conclusion: Optional[str]) -> Tuple[str, str]:
+    """构造检查状态查表键"""
+    return ("", conclusion) if conclusion else (status or "", "")
+
+
+def _truncate(text: str, length: int = 100, suffix: str = "...") -> str:
+    """截断过长文本"""
+    return text if len(text) <= length else text[:length] + suffix
+
+
+# 格式化结果缓存: 同一payload短时间内重复投递时直接复用结果
+_RESULT_CACHE_SIZE = 512
+_RESULT_CACHE_TTL = 60  # 秒
+
+# AI审查消息最多展示的详情条数
+_MAX_REVIEW_DETAILS = 3
+
+
+def _render_review_details(details: List[Any]) -> List[str]:
+    """渲染AI审查详情行"""
+    lines = ["", "📋 审查详情:"]
+    lines.extend(f"  {i}. {detail}" for i, detail in enumerate(islice(details, _MAX_REVIEW_DETAILS), 1))
+    remaining = len(details) - _MAX_REVIEW_DETAILS
+    if remaining > 0:
+        lines.append(f"  ... 还有 {remaining} 条建议")
+    return lines
+
+
+# 状态检查表情映射
+_STATUS_STATE_EMOJI = {
+    "success": "✅",
+    "failure": "❌",
+    "error": "🚨",
+    "pending": "🔄",
+}
+
+# 部署状态映射: state -> (emoji, 文本)
+_DEPLOYMENT_STATE = {
+    "success": ("✅", "成功"),
+    "failure": ("❌", "失败"),
+    "error": ("🚨", "错误"),
+    "pending": ("🔄", "等待中"),
+    "in_progress": ("🔄", "进行中"),
+}
+
+# 各事件动作文本映射
+_PR_ACTION_TEXT = {
+    "opened": "已创建",
+    "closed": "已关闭",
+    "reopened": "已重开",
+    "edited": "已编辑",
+    "ready_for_review": "准备审查",
+    "review_requested": "请求审查",
+    "labeled": "已添加标签",
+    "unlabeled": "已移除标签",
+    "synchronize": "已同步",
+}
+
+_ISSUES_ACTION_TEXT = {
+    "opened": "已创建",
+    "closed": "已关闭",
+    "reopened": "已重开",
+    "edited": "已编辑",
+    "assigned": "已分配",
+    "unassigned": "已取消分配",
+    "labeled": "已添加标签",
+    "unlabeled": "已移除标签",
+}
+
+_DISCUSSION_ACTION_TEXT = {
+    "created": "创建了讨论",
+    "edited": "编辑了讨论",
+    "deleted": "删除了讨论",
+    "answered": "回答了讨论",
+    "unanswered": "取消回答讨论",
+}
+
+_GOLLUM_ACTION_TEXT = {
+    "created": "创建",
+    "edited": "编辑",
+}
+
+_MEMBER_ACTION_TEXT = {
+    "added": "添加了成员",
+    "removed": "移除了成员",
+    "edited": "编辑了成员权限",
+}
+
+_MEMBERSHIP_ACTION_TEXT = {
+    "added": "加入了团队",
+    "removed": "离开了团队",
+}
+
+_MILESTONE_ACTION_TEXT = {
+    "created": "创建了里程碑",
+    "closed": "关闭了里程碑",
+    "opened": "重新打开里程碑",
+    "edited": "编辑了里程碑",
+    "deleted": "删除了里程碑",
+}
+
+_PROJECT_ACTION_TEXT = {
+    "created": "创建了项目",
+    "edited": "编辑了项目",
+    "closed": "关闭了项目",
+    "reopened": "重新打开项目",
+    "deleted": "删除了项目",
+}
+
+_PROJECT_CARD_ACTION_TEXT = {
+    "created": "创建了卡片",
+    "edited": "编辑了卡片",
+    "moved": "移动了卡片",
+    "converted": "转换了卡片",
+    "deleted": "删除了卡片",
+}
+
+_PROJECT_COLUMN_ACTION_TEXT = {
+    "created": "创建了列",
+    "edited": "编辑了列",
+    "moved": "移动了列",
+    "deleted": "删除了列",
+}
+
+_PR_REVIEW_COMMENT_ACTION_TEXT = {
+    "created": "添加了审查评论",
+    "edited": "编辑了审查评论",
+    "deleted": "删除了审查评论",
+}
+
+_REPOSITORY_ACTION_TEXT = {
+    "created": "创建了仓库",
+    "deleted": "删除了仓库",
+    "archived": "归档了仓库",
+    "unarchived": "取消归档仓库",
+    "publicized": "公开了仓库",
+    "privatized": "私有化了仓库",
+    "transferred": "转移了仓库",
+}
+
+_TEAM_ACTION_TEXT = {
+    "created": "创建了团队",
+    "deleted": "删除了团队",
+    "edited": "编辑了团队",
+    "added_to_repository": "添加到仓库",
+    "removed_from_repository": "从仓库移除",
+}
+
+
+@dataclass
+class _FormatContext:
+    """单次分发内共享的格式化上下文"""
+
+    __slots__ = ("display_name", "timestamp", "sender", "repo_url", "title_prefix")
+
+    display_name: str
+    timestamp: str
+    sender: str
+    repo_url: str
+    title_prefix: str  # "{图标} {仓库显示名} ({时间戳})"
+
 
 class MessageFormatter:
     """消息格式化器"""
 
+    __slots__ = ("global_config", "formatters", "_result_cache")
+
     def __init__(self, global_config: Optional[Dict[str, Any]] = None):
         self.global_config = global_config or {}
+        self._result_cache: OrderedDict = OrderedDict()  # key -> (缓存时间, 时间戳, MessageContent)
+        # 分发表: 绑定方法只在初始化时解析一次, 分发时只需一次字典查找
         self.formatters = {
             MessageType.PUSH: self._format_push_message,
             MessageType.PULL_REQUEST: self._format_pr_message,
@@ -187,6 +380,10 @@ class MessageFormatter:
         repo_alias = repo_config.get("repo_mappings", {}).get(repo_name, {}).get("alias")
         return repo_alias or repo_name
 
+    def _get_sender(self, payload: Dict[str, Any]) -> str:
+        """获取事件发送者"""
+        return payload.get("sender", {}).get("login", "Unknown")
+
     def _get_real_pusher(self, payload: Dict[str, Any]) -> str:
         """获取真实的推送者, 避免显示github-actions[bot]"""
         pusher = payload.get("pusher", {}).get("name", "")
@@ -210,12 +407,10 @@ class MessageFormatter:
 
     def _should_filter_bot_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> bool:
         """检查是否应该过滤bot自身的消息"""
-        bot_username = repo_config.get("allow_review", {}).get("bot_username")
-        if bot_username:
-            sender = payload.get("sender", {}).get("login", "")
-            if sender == bot_username:
-                return True
         sender = payload.get("sender", {}).get("login", "")
+        bot_username = repo_config.get("allow_review", {}).get("bot_username")
+        if bot_username and sender == bot_username:
+            return True
         if sender == "github-actions[bot]":
             logger.debug(f"过滤github-actions[bot]消息: {payload.get('repository', {}).get('full_name', 'Unknown')}")
             return True
@@ -338,6 +533,44 @@ class MessageFormatter:
 
         return filtered_mentions
 
+    def _get_result_cache_key(
+        self, message_type: MessageType, payload: Dict[str, Any], ctx: _FormatContext
+    ) -> Optional[Tuple[Any, ...]]:
+        """生成格式化结果缓存键, 返回None表示不缓存"""
+        # 删除类事件不缓存, 避免复用过期的metadata
+        if payload.get("action") == "deleted":
+            return None
+        try:
+            # 同一次投递的重发payload键顺序一致, 无需sort_keys
+            raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str)
+        except (TypeError, ValueError):
+            return None
+        digest = hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+        return (message_type, ctx.display_name, digest)
+
+    def _get_cached_result(self, key: Tuple[Any, ...], ctx: _FormatContext) -> Optional[MessageContent]:
+        """获取未过期的格式化结果, 标题中的时间戳替换为本次的时间戳"""
+        entry = self._result_cache.get(key)
+        if entry is None:
+            return None
+        cached_at, cached_timestamp, content = entry
+        if time.monotonic() - cached_at > _RESULT_CACHE_TTL:
+            del self._result_cache[key]
+            return None
+        self._result_cache.move_to_end(key)
+        # 返回副本: 发送端会直接在content上追加提及信息
+        result = replace(content)
+        if cached_timestamp != ctx.timestamp:
+            result.title = result.title.replace(f"({cached_timestamp})", f"({ctx.timestamp})", 1)
+        return result
+
+    def _store_cached_result(self, key: Tuple[Any, ...], ctx: _FormatContext, content: MessageContent):
+        """缓存格式化结果"""
+        self._result_cache[key] = (time.monotonic(), ctx.timestamp, replace(content))
+        self._result_cache.move_to_end(key)
+        while len(self._result_cache) > _RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+
     def format_message(
         self,
         message_type: MessageType,
@@ -352,24 +585,42 @@ class MessageFormatter:
             return None
 
         formatter = self.formatters.get(message_type)
-        if not formatter:
-            logger.warning(f"未找到消息类型 {message_type} 的格式化器")
-            return self._format_default_message(payload, repo_config)
-
         try:
-            result = formatter(payload, repo_config)
+            # 仓库信息、时间戳和发送者在单次分发内只计算一次
+            display_name = self._get_repo_display_name(payload, repo_config)
+            timestamp = self._get_timestamp()
+            icon = _MESSAGE_TYPE_ICONS.get(message_type, EVENT_ICONS["default"])
+            ctx = _FormatContext(
+                display_name=display_name,
+                timestamp=timestamp,
+                sender=self._get_sender(payload),
+                repo_url=payload.get("repository", {}).get("html_url", ""),
+                title_prefix=f"{icon} {display_name} ({timestamp})",
+            )
+            if not formatter:
+                logger.warning(f"未找到消息类型 {message_type} 的格式化器")
+                return self._format_default_message(payload, repo_config, ctx)
+
+            cache_key = self._get_result_cache_key(message_type, payload, ctx)
+            if cache_key is not None:
+                cached = self._get_cached_result(cache_key, ctx)
+                if cached is not None:
+                    logger.debug(f"命中格式化结果缓存: {message_type.value} - {ctx.display_name}")
+                    return cached
+
+            result = formatter(payload, repo_config, ctx)
             # 某些格式化器可能返回None(如star里程碑检查、fork/watch禁用)
+            if result is not None and cache_key is not None:
+                self._store_cached_result(cache_key, ctx, result)
             return result
         except Exception as e:
             logger.error(f"格式化消息失败: {e}")
             return self._format_error_message(str(e), payload)
 
-    def _format_push_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_push_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化推送消息"""
-        display_name = self._get_repo_display_name(payload, repo_config)
-        icon = EVENT_ICONS.get("push", EVENT_ICONS["default"])
-        timestamp = self._get_timestamp()
-
         ref = payload.get("ref", "")
         branch = ref.split("/")[-1] if ref.startswith("refs/heads/") else ref
 
@@ -381,14 +632,15 @@ class MessageFormatter:
         changed_files = set()  # 用于统计变更的文件
 
         for commit in commits:
-            added += len(commit.get("added", []))
-            modified += len(commit.get("modified", []))
-            removed += len(commit.get("removed", []))
-            changed_files.update(commit.get("added", []))
-            changed_files.update(commit.get("modified", []))
-            changed_files.update(commit.get("removed", []))
-
-        title = f"{icon} {display_name} ({timestamp}) Push 推送~"
+            commit_added = commit.get("added", [])
+            commit_modified = commit.get("modified", [])
+            commit_removed = commit.get("removed", [])
+            added += len(commit_added)
+            modified += len(commit_modified)
+            removed += len(commit_removed)
+            changed_files.update(commit_added, commit_modified, commit_removed)
+
+        title = f"{ctx.title_prefix} Push 推送~"
         content_lines = [
             f"├─ 🌿 分支: {branch}",
             f"├─ 👤 By: {pusher}",
@@ -417,62 +669,47 @@ class MessageFormatter:
                 "commit_count": commit_count,
                 "branch": branch,
                 "changes": {"added": added, "modified": modified, "removed": removed},
-                "files_changed": list(changed_files)[:10],  # 最多保存10个文件名
+                "files_changed": list(islice(changed_files, 10)),  # 最多保存10个文件名
             },
             mentions=self._extract_mentions(payload),
         )
 
-    def _format_pr_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_pr_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化PR消息"""
-        display_name = self._get_repo_display_name(payload, repo_config)
-        icon = EVENT_ICONS.get("pull_request", EVENT_ICONS["default"])
-        timestamp = self._get_timestamp()
         action = payload.get("action", "unknown")
         pr = payload.get("pull_request", {})
         pr_number = pr.get("number", "Unknown")
         pr_title = pr.get("title", "No title")
         pr_url = pr.get("html_url", "")
-        user = payload.get("sender", {}).get("login", "Unknown")
+        user = ctx.sender
         if action == "closed" and pr.get("merged", False):
             action_text = "已合并"
         else:
-            action_map = {
-                "opened": "已创建",
-                "closed": "已关闭",
-                "reopened": "已重开",
-                "edited": "已编辑",
-                "ready_for_review": "准备审查",
-                "review_requested": "请求审查",
-                "labeled": "已添加标签",
-                "unlabeled": "已移除标签",
-                "synchronize": "已同步",
-            }
-            action_text = action_map.get(action, action)
-        title = f"{icon} {display_name} ({timestamp}) PR {action_text}~"
-        content_lines = [f"├─ 🆔 #{pr_number}", f'├─ 📝 标题: "{pr_title}"']
-        if action in ["labeled", "unlabeled"]:
-            label = payload.get("label", {})
-            label_name = label.get("name", "Unknown")
-            label_color = label.get("color", "")
-            content_lines.append(f"├─ 🏷️ 标签: {label_name} (#{label_color if label_color else ''})")
-        content_lines.append(f"└─ 👤 By: {user}")
-        content = "\n".join(content_lines)
-        if pr_url:
-            content += f"\n🔗 {pr_url}"
-
+            action_text = _PR_ACTION_TEXT.get(action, action)
+        title = f"{ctx.title_prefix} PR {action_text}~"
         if action == "review_requested":
             reviewer_login = payload.get("requested_reviewer", {}).get("login", "Unknown") or pr.get(
                 "requested_reviewers", [{}]
             )[0].get("login", "Unknown")
-            content_lines = [
+            content_lines = (
                 f"├─ 🆔 #{pr_number}",
                 f'├─ 📝 标题: "{pr_title}"',
                 f"├─ 👤 请求者: {user}",
                 f"└─ 🔍 审查者: {reviewer_login}",
-            ]
-            content = "\n".join(content_lines)
-            if pr_url:
-                content += f"\n🔗 {pr_url}"
+            )
+        else:
+            content_lines = [f"├─ 🆔 #{pr_number}", f'├─ 📝 标题: "{pr_title}"']
+            if action in ["labeled", "unlabeled"]:
+                label = payload.get("label", {})
+                label_name = label.get("name", "Unknown")
+                label_color = label.get("color", "")
+                content_lines.append(f"├─ 🏷️ 标签: {label_name} (#{label_color if label_color else ''})")
+            content_lines.append(f"└─ 👤 By: {user}")
+        content = "\n".join(content_lines)
+        if pr_url:
+            content += f"\n🔗 {pr_url}"
 
         return MessageContent(
             title=title,
@@ -486,29 +723,18 @@ class MessageFormatter:
             mentions=self._extract_mentions(payload),
         )
 
-    def _format_issues_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_issues_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化Issues消息"""
-        display_name = self._get_repo_display_name(payload, repo_config)
-        icon = EVENT_ICONS.get("issues", EVENT_ICONS["default"])
-        timestamp = self._get_timestamp()
         action = payload.get("action", "unknown")
         issue = payload.get("issue", {})
         issue_number = issue.get("number", "Unknown")
         issue_title = issue.get("title", "No title")
         issue_url = issue.get("html_url", "")
-        user = payload.get("sender", {}).get("login", "Unknown")
-        action_map = {
-            "opened": "已创建",
-            "closed": "已关闭",
-            "reopened": "已重开",
-            "edited": "已编辑",
-            "assigned": "已分配",
-            "unassigned": "已取消分配",
-            "labeled": "已添加标签",
-            "unlabeled": "已移除标签",
-        }
-        action_text = action_map.get(action, action)
-        title = f"{icon} {display_name} ({timestamp}) Issue {action_text}~"
+        user = ctx.sender
+        action_text = _ISSUES_ACTION_TEXT.get(action, action)
+        title = f"{ctx.title_prefix} Issue {action_text}~"
         content_lines = [f"├─ 🆔 #{issue_number}", f'├─ 📝 标题: "{issue_title}"']
         if action in ["labeled", "unlabeled"]:
             label = payload.get("label", {})
@@ -531,19 +757,18 @@ class MessageFormatter:
             mentions=self._extract_mentions(payload),
         )
 
-    def _format_release_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_release_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化发布消息"""
-        display_name = self._get_repo_display_name(payload, repo_config)
-        icon = EVENT_ICONS.get("release", EVENT_ICONS["default"])
-        timestamp = self._get_timestamp()
         action = payload.get("action", "unknown")
         release = payload.get("release", {})
         tag_name = release.get("tag_name", "Unknown")
         release_name = release.get("name", tag_name)
         release_url = release.get("html_url", "")
-        user = payload.get("sender", {}).get("login", "Unknown")
+        user = ctx.sender
         action_text = "已发布" if action == "published" else action
-        title = f"{icon} {display_name} ({timestamp}) Release {action_text}~"
+        title = f"{ctx.title_prefix} Release {action_text}~"
         content_lines = [f"├─ 🏷️ 版本: {tag_name}"]
         if release_name != tag_name:
             content_lines.append(f'├─ 📋 名称: "{release_name}"')
@@ -564,24 +789,23 @@ class MessageFormatter:
             mentions=self._extract_mentions(payload),
         )
 
-    def _format_star_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> Optional[MessageContent]:
+    def _format_star_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> Optional[MessageContent]:
         """格式化星标消息(仅里程碑通知)"""
         action = payload.get("action", "unknown")
         stargazers_count = payload.get("repository", {}).get("stargazers_count", 0)
         if action != "created" or not self._check_star_milestone(stargazers_count, self.global_config):
             return None
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        icon = EVENT_ICONS.get("star", EVENT_ICONS["default"])
-        timestamp = self._get_timestamp()
-        user = payload.get("sender", {}).get("login", "Unknown")
-        repo_url = payload.get("repository", {}).get("html_url", "")
+        user = ctx.sender
+        repo_url = ctx.repo_url
 
-        title = f"{icon} {display_name} ({timestamp}) 🎉 达成 {stargazers_count} Stars 里程碑！"
-        content_lines = [
+        title = f"{ctx.title_prefix} 🎉 达成 {stargazers_count} Stars 里程碑！"
+        content_lines = (
             f"├─ 🎯 里程碑: {stargazers_count} ⭐",
             f"├─ 👤 感谢: @{user}",
-        ]
+        )
 
         content = "\n".join(content_lines)
         if repo_url:
@@ -599,35 +823,41 @@ class MessageFormatter:
             mentions=self._extract_mentions(payload),
         )
 
-    def _format_fork_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> Optional[MessageContent]:
+    def _format_fork_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> Optional[MessageContent]:
         """格式化Fork消息"""
         logger.debug(
             f"Fork事件已记录: {payload.get('sender', {}).get('login', 'Unknown')} forked {payload.get('repository', {}).get('full_name', 'Unknown')}"
         )
         return None
 
-    def _format_watch_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> Optional[MessageContent]:
+    def _format_watch_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> Optional[MessageContent]:
         """格式化Watch消息"""
         logger.debug(
             f"Watch事件已记录: {payload.get('sender', {}).get('login', 'Unknown')} {payload.get('action', 'unknown')} watching {payload.get('repository', {}).get('full_name', 'Unknown')}"
         )
         return None
 
-    def _format_create_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_create_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化创建事件消息"""
         ref_type = payload.get("ref_type", "")
         ref = payload.get("ref", "")
         repo_name = payload.get("repository", {}).get("full_name", "Unknown")
-        sender = payload.get("sender", {}).get("login", "Unknown")
-        repo_url = payload.get("repository", {}).get("html_url", "")
+        sender = ctx.sender
+        repo_url = ctx.repo_url
         type_emoji = {"branch": "🌿", "tag": "🏷️", "repository": "📁"}.get(ref_type, "🆕")
         title = f"{type_emoji} {repo_name} - 创建了{ref_type}"
 
-        content_lines = [
+        content_lines = (
             f"👤 创建者: {sender}",
             f"📝 类型: {ref_type}",
             f"🎯 名称: {ref}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -636,20 +866,22 @@ class MessageFormatter:
             metadata={"ref_type": ref_type, "ref": ref},
         )
 
-    def _format_delete_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_delete_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化删除事件消息"""
         ref_type = payload.get("ref_type", "")
         ref = payload.get("ref", "")
         repo_name = payload.get("repository", {}).get("full_name", "Unknown")
-        sender = payload.get("sender", {}).get("login", "Unknown")
-        repo_url = payload.get("repository", {}).get("html_url", "")
+        sender = ctx.sender
+        repo_url = ctx.repo_url
         type_emoji = {"branch": "🌿", "tag": "🏷️"}.get(ref_type, "🗑️")
         title = f"{type_emoji} {repo_name} - 删除了{ref_type}"
-        content_lines = [
+        content_lines = (
             f"👤 删除者: {sender}",
             f"📝 类型: {ref_type}",
             f"🎯 名称: {ref}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -658,7 +890,9 @@ class MessageFormatter:
             metadata={"ref_type": ref_type, "ref": ref},
         )
 
-    def _format_workflow_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_workflow_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化工作流消息"""
         workflow_run = payload.get("workflow_run", {})
         repo_name = payload.get("repository", {}).get("full_name", "Unknown")
@@ -669,29 +903,17 @@ class MessageFormatter:
         branch = workflow_run.get("head_branch", "Unknown")
         workflow_url = workflow_run.get("html_url", "")
         # 状态
-        if conclusion == "success":
-            emoji = "✅"
-            status_text = "成功"
-        elif conclusion == "failure":
-            emoji = "❌"
-            status_text = "失败"
-        elif conclusion == "cancelled":
-            emoji = "⏹️"
-            status_text = "已取消"
-        elif status == "in_progress":
-            emoji = "🔄"
-            status_text = "运行中"
-        else:
-            emoji = "⚪"
-            status_text = status or conclusion or "未知"
+        emoji, status_text = _CHECK_RUN_STATE.get(
+            _check_state_key(status, conclusion), ("⚪", status or conclusion or "未知")
+        )
 
         title = f"{emoji} {repo_name} - 工作流 {status_text}"
-        content_lines = [
+        content_lines = (
             f"👤 触发者: {actor}",
             f"🔧 工作流: {workflow_name}",
             f"🌿 分支: {branch}",
             f"📊 状态: {status_text}",
-        ]
+        )
         return MessageContent(
             title=title,
             content="\n".join(content_lines),
@@ -704,7 +926,9 @@ class MessageFormatter:
             mentions=self._extract_mentions(payload),
         )
 
-    def _format_system_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_system_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化系统消息"""
         message = payload.get("message", "Unknown")
         level = payload.get("level", "info")
@@ -712,33 +936,32 @@ class MessageFormatter:
 
         level_emoji = {"info": "ℹ️", "warning": "⚠️", "error": "❌", "success": "✅"}.get(level, "ℹ️")
         title = f"{level_emoji} 系统消息 - {level.title()}"
-        content_lines = [f"📡 来源: {source}", f"📝 消息: {message}"]
+        content_lines = (f"📡 来源: {source}", f"📝 消息: {message}")
         return MessageContent(
             title=title,
             content="\n".join(content_lines),
             metadata={"level": level, "source": source},
         )
 
-    def _format_default_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_default_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化默认消息"""
         event_type = payload.get("event_type", "unknown")
-        user = payload.get("sender", {}).get("login", "Unknown")
+        user = ctx.sender
         repo_name = payload.get("repository", {}).get("full_name", "Unknown")
         action = payload.get("action")
         logger.warning(f"未知GitHub事件: {event_type} | 仓库: {repo_name} | 用户: {user} | 动作: {action}")
         logger.debug(f"未知事件详细payload: {json.dumps(payload, indent=2, ensure_ascii=False)[:1000]}")
-        display_name = self._get_repo_display_name(payload, repo_config)
+        display_name = ctx.display_name
         icon = EVENT_ICONS.get("default", "📢")
-        timestamp = self._get_timestamp()
-        repo_url = payload.get("repository", {}).get("html_url", "")
+        timestamp = ctx.timestamp
+        repo_url = ctx.repo_url
         title = f"{icon} {display_name} ({timestamp}) {event_type}~"
-        content_lines = [f"├─ 👤 By: {user}"]
-
         if action:
-            content_lines.append(f"├─ 🔧 Action: {action}")
-            content_lines.append(f"└─ 📝 Event: {event_type}")
+            content_lines = (f"├─ 👤 By: {user}", f"├─ 🔧 Action: {action}", f"└─ 📝 Event: {event_type}")
         else:
-            content_lines.append(f"└─ 📝 Event: {event_type}")
+            content_lines = (f"├─ 👤 By: {user}", f"└─ 📝 Event: {event_type}")
         content = "\n".join(content_lines)
         if repo_url:
             content += f"\n🔗 {repo_url}"
@@ -753,30 +976,31 @@ class MessageFormatter:
 
     def _format_error_message(self, error: str, payload: Dict[str, Any]) -> MessageContent:
         """格式化错误消息"""
+        # 内部格式化错误不需要提及用户, 也就无需遍历整个payload提取mentions
+        if not error:
+            return MessageContent(title="❌ 消息格式化错误", content="格式化消息时发生未知错误")
         return MessageContent(
             title="❌ 消息格式化错误",
             content=f"格式化消息时发生错误: {error}",
-            metadata={"error": error, "raw_payload": payload},
-            mentions=self._extract_mentions(payload),
+            # 只记录payload的键, 避免排队中的错误消息长期引用完整payload
+            metadata={"error": error, "payload_keys": list(payload.keys())},
         )
 
-    def _format_commit_comment_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_commit_comment_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化提交评论消息"""
         comment = payload.get("comment", {})
         commit = payload.get("comment", {}).get("commit_id", "")
-        payload.get("repository", {}).get("full_name", "Unknown")
-        user = payload.get("sender", {}).get("login", "Unknown")
-        comment_body = comment.get("body", "")[:100] + ("..." if len(comment.get("body", "")) > 100 else "")
-
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
+        user = ctx.sender
+        comment_body = _truncate(comment.get("body") or "")
 
-        title = f"💬 {display_name} ({timestamp}) 提交评论"
-        content_lines = [
+        title = f"{ctx.title_prefix} 提交评论"
+        content_lines = (
             f"├─ 👤 评论者: {user}",
             f"├─ 📝 提交: {commit[:8]}",
             f"└─ 💬 内容: {comment_body}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -785,31 +1009,23 @@ class MessageFormatter:
             metadata={"commit_id": commit, "comment_id": comment.get("id")},
         )
 
-    def _format_discussion_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_discussion_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化讨论消息"""
         discussion = payload.get("discussion", {})
         action = payload.get("action", "")
-        payload.get("repository", {}).get("full_name", "Unknown")
-        user = payload.get("sender", {}).get("login", "Unknown")
+        user = ctx.sender
         title_text = discussion.get("title", "Unknown")
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
-
-        action_text = {
-            "created": "创建了讨论",
-            "edited": "编辑了讨论",
-            "deleted": "删除了讨论",
-            "answered": "回答了讨论",
-            "unanswered": "取消回答讨论",
-        }.get(action, f"{action}讨论")
+        action_text = _DISCUSSION_ACTION_TEXT.get(action) or f"{action}讨论"
 
-        title = f"💭 {display_name} ({timestamp}) {action_text}"
-        content_lines = [
+        title = f"{ctx.title_prefix} {action_text}"
+        content_lines = (
             f"├─ 👤 用户: {user}",
             f"├─ 🔧 动作: {action_text}",
             f"└─ 📝 标题: {title_text}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -818,22 +1034,20 @@ class MessageFormatter:
             metadata={"discussion_id": discussion.get("id"), "action": action},
         )
 
-    def _format_gollum_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_gollum_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化Wiki页面消息"""
         pages = payload.get("pages", [])
-        payload.get("repository", {}).get("full_name", "Unknown")
-        user = payload.get("sender", {}).get("login", "Unknown")
-
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
+        user = ctx.sender
 
         if pages:
             page = pages[0]
             page_name = page.get("page_name", "Unknown")
             action = page.get("action", "edited")
-            action_text = {"created": "创建", "edited": "编辑"}.get(action, action)
+            action_text = _GOLLUM_ACTION_TEXT.get(action, action)
 
-            title = f"📖 {display_name} ({timestamp}) Wiki {action_text}"
+            title = f"{ctx.title_prefix} Wiki {action_text}"
             content_lines = [
                 f"├─ 👤 编辑者: {user}",
                 f"├─ 🔧 动作: {action_text}",
@@ -843,67 +1057,59 @@ class MessageFormatter:
             if len(pages) > 1:
                 content_lines.append(f"📊 共 {len(pages)} 个页面被修改")
         else:
-            title = f"📖 {display_name} ({timestamp}) Wiki更新"
-            content_lines = [f"├─ 👤 编辑者: {user}", f"└─ 📄 Wiki页面已更新"]
+            title = f"{ctx.title_prefix} Wiki更新"
+            content_lines = (f"├─ 👤 编辑者: {user}", f"└─ 📄 Wiki页面已更新")
 
         return MessageContent(
             title=title,
             content="\n".join(content_lines),
-            url=payload.get("repository", {}).get("html_url", "") + "/wiki",
+            url=f"{ctx.repo_url}/wiki" if ctx.repo_url else "",
             metadata={"pages_count": len(pages)},
         )
 
-    def _format_member_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_member_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化成员管理消息"""
         action = payload.get("action", "")
         member = payload.get("member", {})
-        payload.get("repository", {}).get("full_name", "Unknown")
-        sender = payload.get("sender", {}).get("login", "Unknown")
+        sender = ctx.sender
         member_login = member.get("login", "Unknown")
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
+        action_text = _MEMBER_ACTION_TEXT.get(action) or f"{action}成员"
 
-        action_text = {
-            "added": "添加了成员",
-            "removed": "移除了成员",
-            "edited": "编辑了成员权限",
-        }.get(action, f"{action}成员")
-
-        title = f"👥 {display_name} ({timestamp}) {action_text}"
-        content_lines = [
+        title = f"{ctx.title_prefix} {action_text}"
+        content_lines = (
             f"├─ 👤 操作者: {sender}",
             f"├─ 🔧 动作: {action_text}",
             f"└─ 👤 成员: {member_login}",
-        ]
+        )
 
         return MessageContent(
             title=title,
             content="\n".join(content_lines),
-            url=payload.get("repository", {}).get("html_url", ""),
+            url=ctx.repo_url,
             metadata={"action": action, "member": member_login},
         )
 
-    def _format_membership_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_membership_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化团队成员消息"""
         action = payload.get("action", "")
         member = payload.get("member", {})
         team = payload.get("team", {})
-        payload.get("sender", {}).get("login", "Unknown")
         member_login = member.get("login", "Unknown")
         team_name = team.get("name", "Unknown")
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
+        action_text = _MEMBERSHIP_ACTION_TEXT.get(action) or f"{action}团队"
 
-        action_text = {"added": "加入了团队", "removed": "离开了团队"}.get(action, f"{action}团队")
-
-        title = f"🏢 {display_name} ({timestamp}) 团队成员变更"
-        content_lines = [
+        title = f"{ctx.title_prefix} 团队成员变更"
+        content_lines = (
             f"├─ 👤 成员: {member_login}",
             f"├─ 🔧 动作: {action_text}",
             f"└─ 👥 团队: {team_name}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -912,26 +1118,18 @@ class MessageFormatter:
             metadata={"action": action, "member": member_login, "team": team_name},
         )
 
-    def _format_milestone_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_milestone_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化里程碑消息"""
         action = payload.get("action", "")
         milestone = payload.get("milestone", {})
-        payload.get("repository", {}).get("full_name", "Unknown")
-        sender = payload.get("sender", {}).get("login", "Unknown")
+        sender = ctx.sender
         milestone_title = milestone.get("title", "Unknown")
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
+        action_text = _MILESTONE_ACTION_TEXT.get(action) or f"{action}里程碑"
 
-        action_text = {
-            "created": "创建了里程碑",
-            "closed": "关闭了里程碑",
-            "opened": "重新打开里程碑",
-            "edited": "编辑了里程碑",
-            "deleted": "删除了里程碑",
-        }.get(action, f"{action}里程碑")
-
-        title = f"🎯 {display_name} ({timestamp}) {action_text}"
+        title = f"{ctx.title_prefix} {action_text}"
         content_lines = [
             f"├─ 👤 操作者: {sender}",
             f"├─ 🔧 动作: {action_text}",
@@ -953,30 +1151,23 @@ class MessageFormatter:
             metadata={"action": action, "milestone_id": milestone.get("id")},
         )
 
-    def _format_project_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_project_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化项目消息"""
         action = payload.get("action", "")
         project = payload.get("project", {})
-        sender = payload.get("sender", {}).get("login", "Unknown")
+        sender = ctx.sender
         project_name = project.get("name", "Unknown")
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
-
-        action_text = {
-            "created": "创建了项目",
-            "edited": "编辑了项目",
-            "closed": "关闭了项目",
-            "reopened": "重新打开项目",
-            "deleted": "删除了项目",
-        }.get(action, f"{action}项目")
+        action_text = _PROJECT_ACTION_TEXT.get(action) or f"{action}项目"
 
-        title = f"📊 {display_name} ({timestamp}) {action_text}"
-        content_lines = [
+        title = f"{ctx.title_prefix} {action_text}"
+        content_lines = (
             f"├─ 👤 操作者: {sender}",
             f"├─ 🔧 动作: {action_text}",
             f"└─ 📝 项目: {project_name}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -985,29 +1176,22 @@ class MessageFormatter:
             metadata={"action": action, "project_id": project.get("id")},
         )
 
-    def _format_project_card_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_project_card_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化项目卡片消息"""
         action = payload.get("action", "")
         project_card = payload.get("project_card", {})
-        sender = payload.get("sender", {}).get("login", "Unknown")
-
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
+        sender = ctx.sender
 
-        action_text = {
-            "created": "创建了卡片",
-            "edited": "编辑了卡片",
-            "moved": "移动了卡片",
-            "converted": "转换了卡片",
-            "deleted": "删除了卡片",
-        }.get(action, f"{action}卡片")
+        action_text = _PROJECT_CARD_ACTION_TEXT.get(action) or f"{action}卡片"
 
-        title = f"🃏 {display_name} ({timestamp}) 项目{action_text}"
-        content_lines = [
+        title = f"{ctx.title_prefix} 项目{action_text}"
+        content_lines = (
             f"├─ 👤 操作者: {sender}",
             f"├─ 🔧 动作: {action_text}",
             f"└─ 🃏 卡片ID: {project_card.get('id', 'Unknown')}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -1016,29 +1200,23 @@ class MessageFormatter:
             metadata={"action": action, "card_id": project_card.get("id")},
         )
 
-    def _format_project_column_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_project_column_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化项目列消息"""
         action = payload.get("action", "")
         project_column = payload.get("project_column", {})
-        sender = payload.get("sender", {}).get("login", "Unknown")
+        sender = ctx.sender
         column_name = project_column.get("name", "Unknown")
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
-
-        action_text = {
-            "created": "创建了列",
-            "edited": "编辑了列",
-            "moved": "移动了列",
-            "deleted": "删除了列",
-        }.get(action, f"{action}列")
+        action_text = _PROJECT_COLUMN_ACTION_TEXT.get(action) or f"{action}列"
 
-        title = f"📋 {display_name} ({timestamp}) 项目{action_text}"
-        content_lines = [
+        title = f"{ctx.title_prefix} 项目{action_text}"
+        content_lines = (
             f"├─ 👤 操作者: {sender}",
             f"├─ 🔧 动作: {action_text}",
             f"└─ 📋 列名: {column_name}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -1047,25 +1225,25 @@ class MessageFormatter:
             metadata={"action": action, "column_id": project_column.get("id")},
         )
 
-    def _format_public_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_public_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化仓库公开消息"""
-        payload.get("repository", {}).get("full_name", "Unknown")
-        sender = payload.get("sender", {}).get("login", "Unknown")
+        sender = ctx.sender
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
-
-        title = f"🌍 {display_name} ({timestamp}) 仓库已公开"
-        content_lines = [f"├─ 👤 操作者: {sender}", f"└─ 🌍 仓库现在对所有人可见"]
+        title = f"{ctx.title_prefix} 仓库已公开"
+        content_lines = (f"├─ 👤 操作者: {sender}", f"└─ 🌍 仓库现在对所有人可见")
 
         return MessageContent(
             title=title,
             content="\n".join(content_lines),
-            url=payload.get("repository", {}).get("html_url", ""),
+            url=ctx.repo_url,
             metadata={"action": "made_public"},
         )
 
-    def _format_pr_review_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_pr_review_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化PR审查消息"""
         action = payload.get("action", "")
         review = payload.get("review", {})
@@ -1075,9 +1253,6 @@ class MessageFormatter:
         pr_title = pull_request.get("title", "Unknown")
         review_state = review.get("state", "")
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
-
         state_emoji = {
             "approved": "✅",
             "changes_requested": "❌",
@@ -1090,12 +1265,12 @@ class MessageFormatter:
             "commented": "评论了",
         }.get(review_state, "审查了")
 
-        title = f"👁️ {display_name} ({timestamp}) PR审查"
-        content_lines = [
+        title = f"{ctx.title_prefix} PR审查"
+        content_lines = (
             f"├─ 👤 审查者: {reviewer}",
             f"├─ {state_emoji} 结果: {state_text}",
             f"└─ 🔀 PR: #{pr_number} {pr_title}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -1108,7 +1283,9 @@ class MessageFormatter:
             },
         )
 
-    def _format_pr_review_comment_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_pr_review_comment_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化PR审查评论消息"""
         action = payload.get("action", "")
         comment = payload.get("comment", {})
@@ -1116,23 +1293,16 @@ class MessageFormatter:
         commenter = comment.get("user", {}).get("login", "Unknown")
         pr_number = pull_request.get("number", 0)
         pr_title = pull_request.get("title", "Unknown")
-        comment_body = comment.get("body", "")[:100] + ("..." if len(comment.get("body", "")) > 100 else "")
-
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
+        comment_body = _truncate(comment.get("body") or "")
 
-        action_text = {
-            "created": "添加了审查评论",
-            "edited": "编辑了审查评论",
-            "deleted": "删除了审查评论",
-        }.get(action, f"{action}审查评论")
+        action_text = _PR_REVIEW_COMMENT_ACTION_TEXT.get(action) or f"{action}审查评论"
 
-        title = f"💬 {display_name} ({timestamp}) {action_text}"
-        content_lines = [
+        title = f"{ctx.title_prefix} {action_text}"
+        content_lines = (
             f"├─ 👤 评论者: {commenter}",
             f"├─ 🔀 PR: #{pr_number} {pr_title}",
             f"└─ 💬 内容: {comment_body}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -1145,32 +1315,23 @@ class MessageFormatter:
             },
         )
 
-    def _format_repository_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_repository_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化仓库事件消息"""
         action = payload.get("action", "")
         repository = payload.get("repository", {})
-        sender = payload.get("sender", {}).get("login", "Unknown")
+        sender = ctx.sender
         repo_name = repository.get("full_name", "Unknown")
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
-
-        action_text = {
-            "created": "创建了仓库",
-            "deleted": "删除了仓库",
-            "archived": "归档了仓库",
-            "unarchived": "取消归档仓库",
-            "publicized": "公开了仓库",
-            "privatized": "私有化了仓库",
-            "transferred": "转移了仓库",
-        }.get(action, f"{action}仓库")
+        action_text = _REPOSITORY_ACTION_TEXT.get(action) or f"{action}仓库"
 
-        title = f"📁 {display_name} ({timestamp}) {action_text}"
-        content_lines = [
+        title = f"{ctx.title_prefix} {action_text}"
+        content_lines = (
             f"├─ 👤 操作者: {sender}",
             f"├─ 🔧 动作: {action_text}",
             f"└─ 📁 仓库: {repo_name}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -1179,7 +1340,9 @@ class MessageFormatter:
             metadata={"action": action, "repo_id": repository.get("id")},
         )
 
-    def _format_status_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_status_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化状态检查消息"""
         state = payload.get("state", "")
         context = payload.get("context", "Unknown")
@@ -1187,23 +1350,18 @@ class MessageFormatter:
         commit = payload.get("commit", {})
         commit_sha = commit.get("sha", "")[:8]
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
-
-        state_emoji = {
-            "success": "✅",
-            "failure": "❌",
-            "error": "🚨",
-            "pending": "🔄",
-        }.get(state, "📊")
+        try:
+            state_emoji = _STATUS_STATE_EMOJI[state]
+        except KeyError:
+            state_emoji = "📊"
 
-        title = f"📊 {display_name} ({timestamp}) 状态检查"
-        content_lines = [
+        title = f"{ctx.title_prefix} 状态检查"
+        content_lines = (
             f"├─ {state_emoji} 状态: {state}",
             f"├─ 🔧 检查: {context}",
             f"├─ 📝 提交: {commit_sha}",
             f"└─ 💬 描述: {description}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -1212,30 +1370,23 @@ class MessageFormatter:
             metadata={"state": state, "context": context, "commit_sha": commit_sha},
         )
 
-    def _format_team_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_team_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化团队消息"""
         action = payload.get("action", "")
         team = payload.get("team", {})
-        sender = payload.get("sender", {}).get("login", "Unknown")
+        sender = ctx.sender
         team_name = team.get("name", "Unknown")
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
-
-        action_text = {
-            "created": "创建了团队",
-            "deleted": "删除了团队",
-            "edited": "编辑了团队",
-            "added_to_repository": "添加到仓库",
-            "removed_from_repository": "从仓库移除",
-        }.get(action, f"{action}团队")
+        action_text = _TEAM_ACTION_TEXT.get(action) or f"{action}团队"
 
-        title = f"👥 {display_name} ({timestamp}) {action_text}"
-        content_lines = [
+        title = f"{ctx.title_prefix} {action_text}"
+        content_lines = (
             f"├─ 👤 操作者: {sender}",
             f"├─ 🔧 动作: {action_text}",
             f"└─ 👥 团队: {team_name}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -1244,22 +1395,21 @@ class MessageFormatter:
             metadata={"action": action, "team_id": team.get("id")},
         )
 
-    def _format_team_add_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_team_add_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化团队添加消息"""
         team = payload.get("team", {})
         repository = payload.get("repository", {})
         team_name = team.get("name", "Unknown")
         repo_name = repository.get("full_name", "Unknown")
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
-
-        title = f"➕ {display_name} ({timestamp}) 团队权限授予"
-        content_lines = [
+        title = f"{ctx.title_prefix} 团队权限授予"
+        content_lines = (
             f"├─ 👥 团队: {team_name}",
             f"├─ 📁 仓库: {repo_name}",
             f"└─ ✅ 团队已获得仓库访问权限",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -1268,7 +1418,9 @@ class MessageFormatter:
             metadata={"team_id": team.get("id"), "repo_id": repository.get("id")},
         )
 
-    def _format_check_run_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_check_run_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化检查运行消息"""
         action = payload.get("action", "")
         check_run = payload.get("check_run", {})
@@ -1276,31 +1428,17 @@ class MessageFormatter:
         status = check_run.get("status", "")
         conclusion = check_run.get("conclusion", "")
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
         # 状态
-        if conclusion == "success":
-            emoji = "✅"
-            status_text = "成功"
-        elif conclusion == "failure":
-            emoji = "❌"
-            status_text = "失败"
-        elif conclusion == "cancelled":
-            emoji = "⏹️"
-            status_text = "已取消"
-        elif status == "in_progress":
-            emoji = "🔄"
-            status_text = "运行中"
-        else:
-            emoji = "✅"
-            status_text = status or conclusion or "未知"
+        emoji, status_text = _CHECK_RUN_STATE.get(
+            _check_state_key(status, conclusion), ("✅", status or conclusion or "未知")
+        )
 
-        title = f"✅ {display_name} ({timestamp}) 检查运行"
-        content_lines = [
+        title = f"{ctx.title_prefix} 检查运行"
+        content_lines = (
             f"├─ {emoji} 状态: {status_text}",
             f"├─ 🔧 检查: {name}",
             f"└─ 🔧 动作: {action}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -1309,36 +1447,26 @@ class MessageFormatter:
             metadata={"action": action, "status": status, "conclusion": conclusion},
         )
 
-    def _format_check_suite_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_check_suite_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化检查套件消息"""
         action = payload.get("action", "")
         check_suite = payload.get("check_suite", {})
         status = check_suite.get("status", "")
         conclusion = check_suite.get("conclusion", "")
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
-
         # 状态表情
-        if conclusion == "success":
-            emoji = "✅"
-            status_text = "成功"
-        elif conclusion == "failure":
-            emoji = "❌"
-            status_text = "失败"
-        elif status == "in_progress":
-            emoji = "🔄"
-            status_text = "运行中"
-        else:
-            emoji = "📋"
-            status_text = status or conclusion or "未知"
+        emoji, status_text = _CHECK_SUITE_STATE.get(
+            _check_state_key(status, conclusion), ("📋", status or conclusion or "未知")
+        )
 
-        title = f"📋 {display_name} ({timestamp}) 检查套件"
-        content_lines = [
+        title = f"{ctx.title_prefix} 检查套件"
+        content_lines = (
             f"├─ {emoji} 状态: {status_text}",
             f"├─ 🔧 动作: {action}",
             f"└─ 📋 套件ID: {check_suite.get('id', 'Unknown')}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -1347,23 +1475,22 @@ class MessageFormatter:
             metadata={"action": action, "status": status, "conclusion": conclusion},
         )
 
-    def _format_deployment_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_deployment_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化部署消息"""
         deployment = payload.get("deployment", {})
-        sender = payload.get("sender", {}).get("login", "Unknown")
+        sender = ctx.sender
         environment = deployment.get("environment", "Unknown")
         ref = deployment.get("ref", "Unknown")
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
-
-        title = f"🚀 {display_name} ({timestamp}) 部署创建"
-        content_lines = [
+        title = f"{ctx.title_prefix} 部署创建"
+        content_lines = (
             f"├─ 👤 部署者: {sender}",
             f"├─ 🌍 环境: {environment}",
             f"├─ 🌿 分支: {ref}",
             f"└─ 🚀 部署已创建",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -1376,38 +1503,26 @@ class MessageFormatter:
             },
         )
 
-    def _format_deployment_status_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_deployment_status_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化部署状态消息"""
         deployment_status = payload.get("deployment_status", {})
         deployment = payload.get("deployment", {})
         state = deployment_status.get("state", "")
         environment = deployment.get("environment", "Unknown")
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
-
-        state_emoji = {
-            "success": "✅",
-            "failure": "❌",
-            "error": "🚨",
-            "pending": "🔄",
-            "in_progress": "🔄",
-        }.get(state, "📊")
+        try:
+            state_emoji, state_text = _DEPLOYMENT_STATE[state]
+        except KeyError:
+            state_emoji, state_text = "📊", state
 
-        state_text = {
-            "success": "成功",
-            "failure": "失败",
-            "error": "错误",
-            "pending": "等待中",
-            "in_progress": "进行中",
-        }.get(state, state)
-
-        title = f"📊 {display_name} ({timestamp}) 部署状态"
-        content_lines = [
+        title = f"{ctx.title_prefix} 部署状态"
+        content_lines = (
             f"├─ {state_emoji} 状态: {state_text}",
             f"├─ 🌍 环境: {environment}",
             f"└─ 🚀 部署ID: {deployment.get('id', 'Unknown')}",
-        ]
+        )
 
         return MessageContent(
             title=title,
@@ -1420,33 +1535,31 @@ class MessageFormatter:
             },
         )
 
-    def _format_page_build_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_page_build_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化页面构建消息"""
         build = payload.get("build", {})
         pusher = build.get("pusher", {}).get("login", "Unknown")
         status = build.get("status", "")
-        error = build.get("error", {})
-
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
+        error_message = build.get("error", {}).get("message")
 
         if status == "built":
             emoji = "✅"
             status_text = "构建成功"
-        elif error.get("message"):
+        elif error_message:
             emoji = "❌"
             status_text = "构建失败"
         else:
             emoji = "📄"
             status_text = "页面构建"
 
-        title = f"📄 {display_name} ({timestamp}) {status_text}"
-        content_lines = [f"├─ 👤 推送者: {pusher}", f"├─ {emoji} 状态: {status_text}"]
-
-        if error.get("message"):
-            content_lines.append(f"└─ ❌ 错误: {error.get('message', '')[:100]}")
-        else:
-            content_lines.append(f"└─ 📄 GitHub Pages 已更新")
+        title = f"{ctx.title_prefix} {status_text}"
+        content_lines = (
+            f"├─ 👤 推送者: {pusher}",
+            f"├─ {emoji} 状态: {status_text}",
+            f"└─ ❌ 错误: {error_message[:100]}" if error_message else "└─ 📄 GitHub Pages 已更新",
+        )
 
         return MessageContent(
             title=title,
@@ -1455,39 +1568,39 @@ class MessageFormatter:
             metadata={"status": status, "build_id": build.get("id")},
         )
 
-    def _format_ping_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_ping_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化Ping消息"""
         zen = payload.get("zen", "GitHub is awesome!")
         hook_id = payload.get("hook_id", "Unknown")
-        sender = payload.get("sender", {}).get("login", "Unknown")
+        sender = ctx.sender
 
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
-
-        title = f"🏓 {display_name} ({timestamp}) Webhook测试"
-        content_lines = [
+        title = f"{ctx.title_prefix} Webhook测试"
+        content_lines = (
             f"├─ 👤 发送者: {sender}",
             f"├─ 🔗 Hook ID: {hook_id}",
             f"└─ 💭 禅语: {zen}",
-        ]
+        )
 
         return MessageContent(
             title=title,
             content="\n".join(content_lines),
-            url=payload.get("repository", {}).get("html_url", ""),
+            url=ctx.repo_url,
             metadata={"hook_id": hook_id, "zen": zen},
         )
 
-    def _format_ai_review_message(self, payload: Dict[str, Any], repo_config: Dict[str, Any]) -> MessageContent:
+    def _format_ai_review_message(
+        self, payload: Dict[str, Any], repo_config: Dict[str, Any], ctx: _FormatContext
+    ) -> MessageContent:
         """格式化AI代码审查消息"""
         # AI审查消息的payload结构可能包含审查结果、PR信息等
         pr_number = payload.get("pr_number", "Unknown")
-        repository_name = payload.get("repository", {}).get("full_name", "Unknown")
         review_summary = payload.get("review_summary", "AI代码审查已完成")
         review_status = payload.get("review_status", "completed")
         
-        display_name = self._get_repo_display_name(payload, repo_config)
-        timestamp = self._get_timestamp()
+        display_name = ctx.display_name
+        timestamp = ctx.timestamp
         
         # 根据审查状态设置不同的图标
         status_icon = "✅" if review_status == "approved" else "⚠️" if review_status == "changes_requested" else "🤖"
@@ -1507,24 +1620,60 @@ class MessageFormatter:
         }
         
         # 如果有审查详情，添加到内容中
-        if "review_details" in payload:
-            details = payload["review_details"]
-            if isinstance(details, list) and details:
-                content_lines.append("")
-                content_lines.append("📋 审查详情:")
-                for i, detail in enumerate(details[:3]):  # 最多显示3条详情
-                    content_lines.append(f"  {i+1}. {detail}")
-                if len(details) > 3:
-                    content_lines.append(f"  ... 还有 {len(details)-3} 条建议")
+        details = payload.get("review_details")
+        if isinstance(details, list) and details:
+            content_lines.extend(_render_review_details(details))
         
         return MessageContent(
             title=title,
             content="\n".join(content_lines),
-            url=payload.get("pr_url", payload.get("repository", {}).get("html_url", "")),
+            url=payload.get("pr_url", ctx.repo_url),
             metadata=metadata,
         )
 
 
+# 消息基础优先级
+_BASE_PRIORITY = {
+    MessageType.SYSTEM: 9,
+    MessageType.AI_REVIEW: 8,
+    MessageType.RELEASE: 7,
+    MessageType.PULL_REQUEST: 6,
+    MessageType.ISSUES: 5,
+    MessageType.WORKFLOW: 4,
+    MessageType.PUSH: 3,
+    MessageType.STAR: 2,
+    MessageType.FORK: 2,
+    MessageType.WATCH: 1,
+    MessageType.CREATE: 1,
+    MessageType.DELETE: 1,
+}
+
+# 优先级加成: (消息类型, 动作/结论) -> 加成
+_PRIORITY_BONUS = {
+    (MessageType.PULL_REQUEST, "opened"): 1,
+    (MessageType.PULL_REQUEST, "closed"): 1,
+    (MessageType.ISSUES, "opened"): 1,
+    (MessageType.ISSUES, "closed"): 1,
+    (MessageType.WORKFLOW, "failure"): 2,
+}
+
+# 格式化工作进程内的格式化器实例
+_worker_formatter: Optional[MessageFormatter] = None
+
+
+def _init_format_worker(global_config: Dict[str, Any]):
+    """初始化格式化工作进程"""
+    global _worker_formatter
+    _worker_formatter = MessageFormatter(global_config)
+
+
+def _format_in_worker(
+    message_type: MessageType, payload: Dict[str, Any], repo_config: Optional[Dict[str, Any]]
+) -> Optional[MessageContent]:
+    """在工作进程中格式化消息"""
+    return _worker_formatter.format_message(message_type, payload, repo_config)
+
+
 class MessageRequestProcessor:
     """消息请求处理器"""
 
@@ -1533,6 +1682,18 @@ class MessageRequestProcessor:
         global_config = config_manager.get_global_config() if hasattr(config_manager, "get_global_config") else {}
         self.formatter = MessageFormatter(global_config)
         self.platform_handlers = {}
+        # repo_name -> (配置版本, 仓库配置, 通知目标), 配置重新加载后自动失效
+        self._repo_cfg_cache: Dict[str, Tuple[Any, Optional[Dict[str, Any]], List[NotificationTarget]]] = {}
+        # 可选的格式化进程池, 仅在高并发突发场景下开启(进程间传输payload有序列化开销)
+        format_workers = config_manager.get("format_workers", 0) if hasattr(config_manager, "get") else 0
+        self._format_pool: Optional[ProcessPoolExecutor] = None
+        if format_workers and format_workers > 0:
+            self._format_pool = ProcessPoolExecutor(
+                max_workers=format_workers,
+                initializer=_init_format_worker,
+                initargs=(global_config,),
+            )
+            logger.info(f"消息格式化进程池已启用: {format_workers} 个工作进程")
         self._register_platform_handlers()
 
     def _register_platform_handlers(self):
@@ -1544,12 +1705,33 @@ class MessageRequestProcessor:
         self.platform_handlers[platform] = handler_func
         logger.success(f"注册消息平台处理器: {platform.value}")
 
+    def _get_repo_entry(self, repo_name: str) -> Tuple[Optional[Dict[str, Any]], List[NotificationTarget]]:
+        """获取仓库配置及其通知目标(按配置版本缓存)"""
+        version = getattr(self.config_manager, "version", None)
+        entry = self._repo_cfg_cache.get(repo_name)
+        if entry is not None and entry[0] == version:
+            return entry[1], entry[2]
+        repo_config = self.config_manager.get_repository_config(repo_name)
+        targets = self._build_notification_targets(repo_name, repo_config)
+        if version is not None:
+            self._repo_cfg_cache[repo_name] = (version, repo_config, targets)
+        return repo_config, targets
+
+    def get_repository_config(self, repo_name: str) -> Optional[Dict[str, Any]]:
+        """获取仓库配置"""
+        return self._get_repo_entry(repo_name)[0]
+
     def get_notification_targets(self, repo_name: str, message_type: MessageType) -> List[NotificationTarget]:
         """获取通知目标列表"""
+        return list(self._get_repo_entry(repo_name)[1])
+
+    def _build_notification_targets(
+        self, repo_name: str, repo_config: Optional[Dict[str, Any]]
+    ) -> List[NotificationTarget]:
+        """根据仓库配置构建通知目标列表"""
         targets = []
 
         try:
-            repo_config = self.config_manager.get_repository_config(repo_name)
             if not repo_config:
                 logger.warning(f"未找到仓库 {repo_name} 的配置")
                 return targets
@@ -1576,78 +1758,88 @@ class MessageRequestProcessor:
 
         return targets
 
-    def create_message_request(
+    async def _format_message(
+        self,
+        message_type: MessageType,
+        payload: Dict[str, Any],
+        repo_config: Optional[Dict[str, Any]],
+    ) -> Optional[MessageContent]:
+        """格式化消息, 启用进程池时在工作进程中执行"""
+        if self._format_pool is None:
+            return self.formatter.format_message(message_type, payload, repo_config)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._format_pool, _format_in_worker, message_type, payload, repo_config)
+
+    async def create_message_request(
         self,
         message_type: MessageType,
         payload: Dict[str, Any],
         repo_name: Optional[str] = None,
     ) -> Optional[MessageRequest]:
         """创建消息请求"""
+        message_requests = await self.create_message_requests_bulk([(message_type, payload)], repo_name)
+        return message_requests[0] if message_requests else None
+
+    async def create_message_requests_bulk(
+        self,
+        events: List[Tuple[MessageType, Dict[str, Any]]],
+        repo_name: Optional[str] = None,
+    ) -> List[MessageRequest]:
+        """批量创建同一仓库的消息请求, 仓库配置和通知目标只解析一次"""
+        if not events:
+            return []
         try:
             # 如果没有提供仓库名, 尝试从payload中提取
             if not repo_name:
-                repo_name = payload.get("repository", {}).get("full_name")
+                repo_name = events[0][1].get("repository", {}).get("full_name")
 
             if not repo_name:
                 logger.warning("无法确定仓库名称")
-                return None
-            repo_config = self.config_manager.get_repository_config(repo_name)
-            content = self.formatter.format_message(message_type, payload, repo_config)
-            if content is None:
-                logger.debug(f"消息被过滤或禁用: {message_type.value} - {repo_name}")
-                return None
-            targets = self.get_notification_targets(repo_name, message_type)
-
-            if not targets:
-                logger.info(f"仓库 {repo_name} 的 {message_type.value} 事件没有配置通知目标")
-                return None
-            message_request = MessageRequest(
-                message_type=message_type,
-                content=content,
-                targets=targets,
-                priority=self._get_message_priority(message_type, payload),
-            )
-
-            logger.info(f"创建消息请求: {message_type.value} -> {len(targets)} 个目标")
-            return message_request
-
+                return []
+            repo_config = self.get_repository_config(repo_name)
         except Exception as e:
             logger.error(f"创建消息请求失败: {e}")
-            return None
+            return []
+        # 通知目标按消息类型缓存, 同类型请求共用同一列表(下游只读)
+        targets_by_type: Dict[MessageType, List[NotificationTarget]] = {}
+        message_requests = []
+        for message_type, payload in events:
+            try:
+                content = await self._format_message(message_type, payload, repo_config)
+                if content is None:
+                    logger.debug(f"消息被过滤或禁用: {message_type.value} - {repo_name}")
+                    continue
+                targets = targets_by_type.get(message_type)
+                if targets is None:
+                    targets = targets_by_type[message_type] = self.get_notification_targets(repo_name, message_type)
+
+                if not targets:
+                    logger.info(f"仓库 {repo_name} 的 {message_type.value} 事件没有配置通知目标")
+                    continue
+                message_requests.append(
+                    MessageRequest(
+                        message_type=message_type,
+                        content=content,
+                        targets=targets,
+                        priority=self._get_message_priority(message_type, payload),
+                    )
+                )
+
+                logger.info(f"创建消息请求: {message_type.value} -> {len(targets)} 个目标")
+
+            except Exception as e:
+                logger.error(f"创建消息请求失败: {e}")
+        return message_requests
 
     def _get_message_priority(self, message_type: MessageType, payload: Dict[str, Any]) -> int:
         """获取消息优先级"""
-        base_priority = {
-            MessageType.SYSTEM: 9,
-            MessageType.AI_REVIEW: 8,
-            MessageType.RELEASE: 7,
-            MessageType.PULL_REQUEST: 6,
-            MessageType.ISSUES: 5,
-            MessageType.WORKFLOW: 4,
-            MessageType.PUSH: 3,
-            MessageType.STAR: 2,
-            MessageType.FORK: 2,
-            MessageType.WATCH: 1,
-            MessageType.CREATE: 1,
-            MessageType.DELETE: 1,
-        }.get(message_type, 5)
-
-        if message_type == MessageType.PULL_REQUEST:
-            action = payload.get("action", "")
-            if action in ["opened", "closed"]:
-                base_priority += 1
-
-        elif message_type == MessageType.ISSUES:
-            action = payload.get("action", "")
-            if action in ["opened", "closed"]:
-                base_priority += 1
-
-        elif message_type == MessageType.WORKFLOW:
-            conclusion = payload.get("workflow_run", {}).get("conclusion", "")
-            if conclusion == "failure":
-                base_priority += 2
-
-        return min(base_priority, 10)  # 最大优先级为10
+        base_priority = _BASE_PRIORITY.get(message_type, 5)
+        # 工作流按结论加权, 其余按动作加权
+        if message_type is MessageType.WORKFLOW:
+            key = payload.get("workflow_run", {}).get("conclusion", "")
+        else:
+            key = payload.get("action", "")
+        return min(base_priority + _PRIORITY_BONUS.get((message_type, key), 0), 10)  # 最大优先级为10
 
     async def process_message_request(self, message_request: MessageRequest) -> bool:
         """处理消息请求(使用消息聚合器)"""
@@ -1657,22 +1849,16 @@ class MessageRequestProcessor:
             webhook_bot = get_bot()
 
             if webhook_bot and hasattr(webhook_bot, "msg_aggregator") and webhook_bot.msg_aggregator:
-                success_count = 0
                 total_count = len(message_request.targets)
-
-                for target in message_request.targets:
-                    try:
-                        handler = self.platform_handlers.get(target.platform)
-                        if not handler:
-                            logger.warning(f"未找到平台 {target.platform.value} 的处理器")
-                            continue
-                        aggregation_key = f"{target.platform.value}_{target.target_id}"
-                        await webhook_bot.msg_aggregator.add_message(aggregation_key, message_request.content, [target])
-                        success_count += 1
-                        logger.debug(f"消息已添加到聚合器: {target.platform.value} -> {target.target_id}")
-
-                    except Exception as e:
-                        logger.error(f"添加消息到聚合器异常: {target.platform.value} -> {target.target_id}, 错误: {e}")
+                # 各目标相互独立, 并发添加到聚合器
+                results = await asyncio.gather(
+                    *(
+                        self._add_to_aggregator(webhook_bot.msg_aggregator, message_request, target)
+                        for target in message_request.targets
+                    ),
+                    return_exceptions=True,
+                )
+                success_count = sum(1 for result in results if result is True)
 
                 success = success_count > 0
                 if success:
@@ -1701,25 +1887,13 @@ class MessageRequestProcessor:
                 logger.debug(f"处于禁言状态, 跳过直接发送消息。剩余时间: {remaining:.1f}秒")
                 return False
 
-        success_count = 0
         total_count = len(message_request.targets)
-
-        for target in message_request.targets:
-            try:
-                handler = self.platform_handlers.get(target.platform)
-                if not handler:
-                    logger.warning(f"未找到平台 {target.platform.value} 的处理器")
-                    continue
-                success = await handler(message_request.content, target)
-
-                if success:
-                    success_count += 1
-                    logger.debug(f"消息发送成功: {target.platform.value} -> {target.target_id}")
-                else:
-                    logger.warning(f"消息发送失败: {target.platform.value} -> {target.target_id}")
-
-            except Exception as e:
-                logger.error(f"处理消息目标异常: {target.platform.value} -> {target.target_id}, 错误: {e}")
+        # 各目标相互独立, 并发发送
+        results = await asyncio.gather(
+            *(self._send_to_target(message_request, target) for target in message_request.targets),
+            return_exceptions=True,
+        )
+        success_count = sum(1 for result in results if result is True)
 
         success = success_count > 0
         if success:
@@ -1729,6 +1903,47 @@ class MessageRequestProcessor:
 
         return success
 
+    async def _add_to_aggregator(self, aggregator, message_request: MessageRequest, target: NotificationTarget) -> bool:
+        """将消息添加到单个目标的聚合队列"""
+        try:
+            handler = self.platform_handlers.get(target.platform)
+            if not handler:
+                logger.warning(f"未找到平台 {target.platform.value} 的处理器")
+                return False
+            aggregation_key = f"{target.platform.value}_{target.target_id}"
+            await aggregator.add_message(aggregation_key, message_request.content, [target])
+            logger.debug(f"消息已添加到聚合器: {target.platform.value} -> {target.target_id}")
+            return True
+
+        except Exception as e:
+            logger.error(f"添加消息到聚合器异常: {target.platform.value} -> {target.target_id}, 错误: {e}")
+            return False
+
+    async def _send_to_target(self, message_request: MessageRequest, target: NotificationTarget) -> bool:
+        """直接发送消息到单个目标"""
+        try:
+            handler = self.platform_handlers.get(target.platform)
+            if not handler:
+                logger.warning(f"未找到平台 {target.platform.value} 的处理器")
+                return False
+            success = await handler(message_request.content, target)
+
+            if success:
+                logger.debug(f"消息发送成功: {target.platform.value} -> {target.target_id}")
+                return True
+            logger.warning(f"消息发送失败: {target.platform.value} -> {target.target_id}")
+            return False
+
+        except Exception as e:
+            logger.error(f"处理消息目标异常: {target.platform.value} -> {target.target_id}, 错误: {e}")
+            return False
+
+    def cleanup(self):
+        """释放格式化进程池"""
+        if self._format_pool is not None:
+            self._format_pool.shutdown(cancel_futures=True)
+            self._format_pool = None
+
 
 # 全局消息请求处理器实例
 _message_processor = None
@@ -1746,4 +1961,5 @@ def cleanup_message_processor():
     """清理消息处理器资源"""
     global _message_processor
     if _message_processor:
+        _message_processor.cleanup()
         _message_processor = None
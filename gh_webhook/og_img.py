@@ -4,19 +4,76 @@ OG图片处理
 
 import asyncio
 import hashlib
+import heapq
+import json
 import os
+import re
+import sqlite3
 import time
-from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import count
 from threading import Lock
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import urljoin, urlparse
 
 import aiofiles
 import aiohttp
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from PIL import Image
 from loguru import logger
 
+try:
+    import pyvips
+
+    PYVIPS_AVAILABLE = True
+except (ImportError, OSError):
+    # 未安装pyvips或缺少libvips时回退到Pillow
+    PYVIPS_AVAILABLE = False
+    pyvips = None
+
+try:
+    import lxml  # noqa: F401
+
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# 缓存索引数据库文件名
+CACHE_DB_NAME = "image_cache.sqlite"
+# 旧版JSON缓存索引文件名(仅用于迁移)
+LEGACY_CACHE_FILE = "image_cache.json"
+# 图片缓存最大条目数
+MAX_CACHE_ENTRIES = 1000
+# 提取OG图片只需解析meta和img标签
+OG_PARSE_STRAINER = SoupStrainer(["meta", "img"])
+# 回退查找img时跳过的关键字
+IMG_SKIP_PATTERN = re.compile(r"icon|logo|avatar|thumb", re.IGNORECASE)
+# 网页读取分块大小
+HTML_CHUNK_SIZE = 16 * 1024
+# 网页最多读取字节数(未在<head>中找到OG信息时供img回退查找)
+HTML_MAX_BYTES = 1024 * 1024
+# 图片下载分块大小
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+# 不超过该大小的图片一次性读取写入
+SMALL_IMAGE_BYTES = 2 * 1024 * 1024
+# 请求OG页面和图片使用的UA
+REQUEST_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/91.0.4472.124 Safari/537.36"
+)
+
+
+@lru_cache(maxsize=1024)
+def _is_valid_http_url(url: str) -> bool:
+    """验证http(s) URL, 先做前缀预筛再解析"""
+    if not url[:8].lower().startswith(("http://", "https://")):
+        return False
+    try:
+        return bool(urlparse(url).netloc)
+    except Exception:
+        return False
+
 
 class OGImageManager:
     """OG图片管理器"""
@@ -25,81 +82,188 @@ class OGImageManager:
         self.cache_dir = cache_dir
         self.image_cache_dir = os.path.join(cache_dir, "images")
         self.image_cache_days = image_cache_days
-        self.image_cache = OrderedDict()
+        # 缓存键 -> 缓存信息, last_access为访问序号(按此淘汰最久未用条目)
+        self.image_cache: Dict[str, Dict[str, Any]] = {}
+        self._tick = count()
+        # (时间戳, 缓存键)最小堆, 用于按时间顺序清理过期条目
+        self._ts_heap: List[Tuple[float, str]] = []
+        # 缓存图片总大小, 随增删维护
+        self._total_size = 0
         self.cache_lock = Lock()
-        self.async_lock = asyncio.Lock()
+        # 进行中的获取: 缓存键 -> 结果future, 合并同一URL的并发请求
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.session: Optional[aiohttp.ClientSession] = None
         os.makedirs(self.image_cache_dir, exist_ok=True)
+        self._db = self._open_db()
         self._load_image_cache()
 
+    def _open_db(self) -> sqlite3.Connection:
+        """打开缓存索引数据库"""
+        db = sqlite3.connect(
+            os.path.join(self.cache_dir, CACHE_DB_NAME),
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS cache("
+            "key TEXT PRIMARY KEY, url TEXT, image_url TEXT, path TEXT, ts REAL, size INTEGER)"
+        )
+        return db
+
+    def _migrate_legacy_cache(self):
+        """将旧版JSON缓存索引导入数据库"""
+        legacy_file = os.path.join(self.cache_dir, LEGACY_CACHE_FILE)
+        if not os.path.exists(legacy_file):
+            return
+        try:
+            with open(legacy_file, "r", encoding="utf-8") as f:
+                cache_data = json.load(f)
+            with self._transaction():
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            key,
+                            info.get("url"),
+                            info.get("image_url"),
+                            info.get("cache_path"),
+                            info.get("timestamp", 0),
+                            info.get("file_size", 0),
+                        )
+                        for key, info in cache_data.items()
+                    ],
+                )
+            os.replace(legacy_file, legacy_file + ".bak")
+            logger.info(f"已迁移旧版图片缓存索引: {len(cache_data)}个条目")
+        except Exception as e:
+            logger.error(f"迁移旧版图片缓存索引失败: {e}")
+
     def _load_image_cache(self):
         """加载图片缓存索引"""
-        cache_file = os.path.join(self.cache_dir, "image_cache.json")
         try:
-            if os.path.exists(cache_file):
-                import json
-
-                with open(cache_file, "r", encoding="utf-8") as f:
-                    cache_data = json.load(f)
-                # 验证缓存文件是否存在
-                valid_cache = {}
-                for url, info in cache_data.items():
-                    cache_path = info.get("cache_path")
+            self._migrate_legacy_cache()
+            rows = self._db.execute("SELECT key, url, image_url, path, ts, size FROM cache ORDER BY ts").fetchall()
+            # 验证缓存文件是否存在
+            valid_cache = {}
+            missing_keys = []
+            with self._transaction():
+                for key, url, image_url, cache_path, ts, size in rows:
                     if cache_path and os.path.exists(cache_path):
-                        valid_cache[url] = info
-
-                self.image_cache = OrderedDict(valid_cache)
+                        info = {
+                            "url": url,
+                            "image_url": image_url,
+                            "cache_path": cache_path,
+                            "timestamp": ts,
+                            "file_size": size,
+                            "last_access": next(self._tick),
+                        }
+                        self._migrate_to_shard(key, info)
+                        valid_cache[key] = info
+                    else:
+                        missing_keys.append(key)
+                self._delete_cache_entries(missing_keys)
+            self.image_cache = valid_cache
+            self._total_size = sum(info["file_size"] or 0 for info in valid_cache.values())
+            self._rebuild_ts_heap()
+            if valid_cache:
                 logger.success(f"加载图片缓存: {len(self.image_cache)}个条目")
             else:
-                self.image_cache = OrderedDict()
                 logger.success("创建新的缓存器")
         except Exception as e:
             logger.error(f"加载图片缓存失败: {e}")
-            self.image_cache = OrderedDict()
+            self.image_cache = {}
+
+    def _cache_path(self, cache_key: str, ext: str = ".jpg") -> str:
+        """按缓存键前两位分目录存放图片"""
+        shard_dir = os.path.join(self.image_cache_dir, cache_key[:2])
+        os.makedirs(shard_dir, exist_ok=True)
+        return os.path.join(shard_dir, cache_key + ext)
+
+    def _migrate_to_shard(self, cache_key: str, info: Dict[str, Any]):
+        """将旧版平铺存放的图片移入分片目录"""
+        cache_path = info["cache_path"]
+        if os.path.dirname(os.path.abspath(cache_path)) != os.path.abspath(self.image_cache_dir):
+            return
+        new_path = self._cache_path(cache_key, os.path.splitext(cache_path)[1] or ".jpg")
+        try:
+            os.replace(cache_path, new_path)
+        except OSError as e:
+            logger.warning(f"迁移缓存图片失败: {e}")
+            return
+        info["cache_path"] = new_path
+        self._persist_cache_entry(cache_key, info)
+
+    @contextmanager
+    def _transaction(self):
+        """将多条索引写入合并为一个事务(一次提交), 支持嵌套"""
+        if self._db.in_transaction:
+            yield
+            return
+        self._db.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def _persist_cache_entry(self, cache_key: str, info: Dict[str, Any]):
+        """写入单条缓存索引"""
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    cache_key,
+                    info.get("url"),
+                    info.get("image_url"),
+                    info.get("cache_path"),
+                    info.get("timestamp", 0),
+                    info.get("file_size", 0),
+                ),
+            )
+        except Exception as e:
+            logger.error(f"保存图片缓存索引失败: {e}")
 
-    async def _save_image_cache(self):
-        """保存图片缓存索引"""
-        cache_file = os.path.join(self.cache_dir, "image_cache.json")
-        temp_file = cache_file + ".tmp"
+    def _delete_cache_entries(self, cache_keys: List[str]):
+        """删除缓存索引"""
+        if not cache_keys:
+            return
+        try:
+            with self._transaction():
+                self._db.executemany("DELETE FROM cache WHERE key = ?", [(key,) for key in cache_keys])
+        except Exception as e:
+            logger.error(f"删除图片缓存索引失败: {e}")
 
+    async def close(self):
+        """关闭HTTP会话和缓存索引数据库"""
+        if self.session and not self.session.closed:
+            await self.session.close()
         try:
-            import json
-
-            async with aiofiles.open(temp_file, "w", encoding="utf-8") as f:
-                await f.write(json.dumps(dict(self.image_cache), indent=2, ensure_ascii=False))
-            if os.path.exists(cache_file):
-                os.remove(cache_file)
-            os.rename(temp_file, cache_file)
-            # logger.debug("图片缓存索引保存成功")
+            self._db.close()
         except Exception as e:
-            logger.error(f"保存图片缓存索引失败: {e}")
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
+            logger.error(f"关闭图片缓存索引失败: {e}")
 
     def _get_cache_key(self, url: str) -> str:
         """生成缓存键"""
-        return hashlib.md5(url.encode("utf-8")).hexdigest()
+        # 旧版MD5键(32位)不再命中, 随过期清理自然淘汰
+        return hashlib.blake2s(url.encode("utf-8"), digest_size=8).hexdigest()
 
     def _is_valid_url(self, url: str) -> bool:
         """验证URL是否有效"""
         if not url or not isinstance(url, str):
             return False
-
-        try:
-            result = urlparse(url)
-            return all([result.scheme, result.netloc]) and result.scheme in [
-                "http",
-                "https",
-            ]
-        except Exception:
-            return False
+        return _is_valid_http_url(url)
 
     async def _extract_og_image_from_html(self, html_content: str, base_url: str) -> Optional[str]:
         """从HTML内容中提取OG图片URL"""
+        return await asyncio.to_thread(self._parse_og_image, html_content, base_url)
+
+    def _parse_og_image(self, html_content: str, base_url: str) -> Optional[str]:
+        """解析HTML提取OG图片URL(在线程池中执行)"""
         try:
-            soup = BeautifulSoup(html_content, "html.parser")
+            soup = BeautifulSoup(html_content, HTML_PARSER, parse_only=OG_PARSE_STRAINER)
             # 查找OG图片
             og_image = soup.find("meta", property="og:image")
             if og_image and og_image.get("content"):
@@ -111,11 +275,10 @@ class OGImageManager:
                 image_url = twitter_image["content"]
                 return urljoin(base_url, image_url)
             # fallback：查找第一个较大的图片
-            images = soup.find_all("img")
-            for img in images:
+            for img in soup.find_all("img"):
                 src = img.get("src")
                 if src:
-                    if any(keyword in src.lower() for keyword in ["icon", "logo", "avatar", "thumb"]):
+                    if IMG_SKIP_PATTERN.search(src):
                         continue
                     return urljoin(base_url, src)
             return None
@@ -129,8 +292,42 @@ class OGImageManager:
         target_width: int = 1600,
         target_height: int = 1200,
         quality: int = 85,
-    ) -> bool:
-        """调整图片大小"""
+    ) -> Optional[int]:
+        """调整图片大小, 返回调整后的文件大小(未调整或失败时返回None)"""
+        if PYVIPS_AVAILABLE:
+            try:
+                return self._resize_image_vips(image_path, target_width, target_height, quality)
+            except Exception as e:
+                logger.warning(f"libvips调整图片失败, 回退到Pillow: {e}")
+        return self._resize_image_pil(image_path, target_width, target_height, quality)
+
+    def _resize_image_vips(
+        self, image_path: str, target_width: int, target_height: int, quality: int
+    ) -> Optional[int]:
+        """使用libvips调整图片大小(解码、缩放、编码一次完成)"""
+        header = pyvips.Image.new_from_file(image_path, access="sequential")
+        original_width, original_height = header.width, header.height
+        if original_width <= target_width and original_height <= target_height:
+            return None
+        img = pyvips.Image.thumbnail(image_path, target_width, height=target_height, size="down")
+        if img.hasalpha():
+            img = img.flatten(background=[255, 255, 255])
+        # 源文件按需读取, 先写临时文件再替换
+        temp_path = image_path + ".tmp.jpg"
+        try:
+            img.jpegsave(temp_path, Q=quality, strip=True, optimize_coding=True)
+            file_size = os.path.getsize(temp_path)
+            os.replace(temp_path, image_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        logger.debug(f"图片已调整: {original_width}x{original_height} -> {img.width}x{img.height}")
+        return file_size
+
+    def _resize_image_pil(
+        self, image_path: str, target_width: int, target_height: int, quality: int
+    ) -> Optional[int]:
+        """使用Pillow调整图片大小"""
         try:
             with Image.open(image_path) as img:
                 # 转RGB
@@ -144,7 +341,7 @@ class OGImageManager:
                     img = img.convert("RGB")
                 original_width, original_height = img.size
                 if original_width <= target_width and original_height <= target_height:
-                    return True
+                    return None
                 # 调整缩放比例
                 width_ratio = target_width / original_width
                 height_ratio = target_height / original_height
@@ -154,49 +351,89 @@ class OGImageManager:
                 resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
                 resized_img.save(image_path, "JPEG", quality=quality, optimize=True)
                 logger.debug(f"图片已调整: {original_width}x{original_height} -> {new_width}x{new_height}")
-                return True
+                return os.path.getsize(image_path)
 
         except Exception as e:
             logger.error(f"调整图片大小失败: {e}")
-            return False
+            return None
 
-    async def _download_image(self, image_url: str, save_path: str, proxy_config: Optional[Dict] = None) -> bool:
-        """下载图片"""
-        try:
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """获取HTTP会话"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=64, ttl_dns_cache=300, keepalive_timeout=60)
             timeout = aiohttp.ClientTimeout(total=30, connect=10)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                headers={"User-Agent": REQUEST_USER_AGENT},
+            )
+        return self.session
+
+    @staticmethod
+    def _get_proxy_url(proxy_config: Optional[Dict]) -> Optional[str]:
+        """获取代理地址"""
+        if proxy_config and proxy_config.get("enabled"):
+            return proxy_config.get("url")
+        return None
+
+    @staticmethod
+    def _write_file(path: str, data: bytes):
+        """写入文件"""
+        with open(path, "wb") as f:
+            f.write(data)
+
+    @staticmethod
+    def _preallocate_file(path: str, size: int):
+        """创建(清空)文件, 已知大小时预分配磁盘空间"""
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            if size > 0 and hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(fd, 0, size)
+                except OSError:
+                    pass
+        finally:
+            os.close(fd)
 
-            async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(), timeout=timeout) as session:
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-                }
-
-                proxy_url = None
-                if proxy_config and proxy_config.get("enabled"):
-                    proxy_url = proxy_config.get("url")
-
-                async with session.get(image_url, headers=headers, proxy=proxy_url) as response:
-                    if response.status == 200:
-                        content_type = response.headers.get("content-type", "").lower()
-                        if not content_type.startswith("image/"):
-                            logger.warning(f"URL返回的不是图片类型: {content_type}")
-                            return False
-                        content_length = response.headers.get("content-length")
-                        if content_length and int(content_length) > 50 * 1024 * 1024:  # 50MB限制
-                            logger.warning(f"图片文件过大: {content_length} bytes")
-                            return False
-                        async with aiofiles.open(save_path, "wb") as f:
-                            async for chunk in response.content.iter_chunked(8192):
-                                await f.write(chunk)
-                        file_size = os.path.getsize(save_path)
-                        if file_size == 0:
-                            logger.warning("下载的图片文件为空")
-                            os.remove(save_path)
-                            return False
-                        logger.debug(f"图片下载成功: {file_size} bytes")
-                        return True
+    async def _download_image(self, image_url: str, save_path: str, proxy_config: Optional[Dict] = None) -> int:
+        """下载图片, 返回文件大小(失败返回0)"""
+        try:
+            session = await self._get_session()
+            proxy_url = self._get_proxy_url(proxy_config)
+            async with session.get(image_url, proxy=proxy_url) as response:
+                if response.status == 200:
+                    content_type = response.headers.get("content-type", "").lower()
+                    if not content_type.startswith("image/"):
+                        logger.warning(f"URL返回的不是图片类型: {content_type}")
+                        return 0
+                    content_length = response.headers.get("content-length")
+                    if content_length and int(content_length) > 50 * 1024 * 1024:  # 50MB限制
+                        logger.warning(f"图片文件过大: {content_length} bytes")
+                        return 0
+                    expected_size = int(content_length) if content_length else 0
+                    if 0 < expected_size <= SMALL_IMAGE_BYTES:
+                        # 小图一次读完, 单次写入
+                        data = await response.read()
+                        await asyncio.to_thread(self._write_file, save_path, data)
+                        file_size = len(data)
                     else:
-                        logger.warning(f"下载图片失败, 状态码: {response.status}")
-                        return False
+                        await asyncio.to_thread(self._preallocate_file, save_path, expected_size)
+                        file_size = 0
+                        async with aiofiles.open(save_path, "r+b") as f:
+                            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                                await f.write(chunk)
+                                file_size += len(chunk)
+                            # 去掉预分配多出的部分
+                            await f.truncate()
+                    if file_size == 0:
+                        logger.warning("下载的图片文件为空")
+                        os.remove(save_path)
+                        return 0
+                    logger.debug(f"图片下载成功: {file_size} bytes")
+                    return file_size
+                else:
+                    logger.warning(f"下载图片失败, 状态码: {response.status}")
+                    return 0
 
         except Exception as e:
             logger.error(f"下载图片异常: {e}")
@@ -205,7 +442,40 @@ class OGImageManager:
                     os.remove(save_path)
                 except:
                     pass
-            return False
+            return 0
+
+    @staticmethod
+    async def _read_html(response) -> str:
+        """增量读取网页, 读到包含OG信息的</head>或达到上限即停止"""
+        buf = bytearray()
+        head_found = False
+        async for chunk in response.content.iter_chunked(HTML_CHUNK_SIZE):
+            # 与上一块重叠几个字节, 避免标签被分块截断
+            search_start = max(len(buf) - 8, 0)
+            buf += chunk
+            if not head_found and b"</head>" in bytes(buf[search_start:]).lower():
+                head_found = True
+                head = bytes(buf).lower()
+                # OG信息只会出现在<head>中, 找到即可停止; 否则继续读取供img回退查找
+                if b"og:image" in head or b"twitter:image" in head:
+                    break
+            if len(buf) >= HTML_MAX_BYTES:
+                break
+        return bytes(buf).decode(response.charset or "utf-8", errors="replace")
+
+    def _get_cached_path(self, cache_key: str) -> Optional[str]:
+        """获取未过期的缓存图片路径"""
+        cache_info = self.image_cache.get(cache_key)
+        if not cache_info:
+            return None
+        cache_path = cache_info.get("cache_path")
+        cache_time = cache_info.get("timestamp", 0)
+        if (time.time() - cache_time) < (self.image_cache_days * 24 * 3600):
+            if cache_path and os.path.exists(cache_path):
+                # next(count)在CPython下是原子操作, 命中路径无需加锁
+                cache_info["last_access"] = next(self._tick)
+                return cache_path
+        return None
 
     async def get_og_image(
         self, url: str, force_refresh: bool = False, proxy_config: Optional[Dict] = None
@@ -225,71 +495,93 @@ class OGImageManager:
             logger.warning(f"无效的URL: {url}")
             return None
         cache_key = self._get_cache_key(url)
-        current_time = time.time()
         # 检查缓存
-        if not force_refresh and cache_key in self.image_cache:
-            cache_info = self.image_cache[cache_key]
-            cache_path = cache_info.get("cache_path")
-            cache_time = cache_info.get("timestamp", 0)
-            if (current_time - cache_time) < (self.image_cache_days * 24 * 3600):
-                if cache_path and os.path.exists(cache_path):
-                    logger.debug(f"使用缓存的OG图片: {url}")
-                    with self.cache_lock:
-                        self.image_cache.move_to_end(cache_key)
-                    return cache_path
-
-        async with self.async_lock:
-            try:
-                timeout = aiohttp.ClientTimeout(total=30, connect=10)
-                async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(), timeout=timeout) as session:
-                    headers = {
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-                    }
-
-                    proxy_url = None
-                    if proxy_config and proxy_config.get("enabled"):
-                        proxy_url = proxy_config.get("url")
-                    async with session.get(url, headers=headers, proxy=proxy_url) as response:
-                        if response.status != 200:
-                            logger.warning(f"获取网页失败, 状态码: {response.status}")
-                            return None
-
-                        html_content = await response.text()
-
-                image_url = await self._extract_og_image_from_html(html_content, url)
-                if not image_url:
-                    logger.info(f"未找到OG图片: {url}")
-                    return None
-                file_extension = ".jpg"  # 保存为jpg
-                cache_filename = f"{cache_key}{file_extension}"
-                cache_path = os.path.join(self.image_cache_dir, cache_filename)
-                if await self._download_image(image_url, cache_path, proxy_config):
-                    self._resize_image(cache_path)
-                    with self.cache_lock:
-                        self.image_cache[cache_key] = {
-                            "url": url,
-                            "image_url": image_url,
-                            "cache_path": cache_path,
-                            "timestamp": current_time,
-                            "file_size": os.path.getsize(cache_path),
-                        }
-                        while len(self.image_cache) > 1000:
-                            oldest_key, oldest_info = self.image_cache.popitem(last=False)
-                            old_path = oldest_info.get("cache_path")
-                            if old_path and os.path.exists(old_path):
-                                try:
-                                    os.remove(old_path)
-                                except:
-                                    pass
-                    await self._save_image_cache()
-                    logger.info(f"OG图片获取成功: {url} -> {cache_path}")
-                    return cache_path
-                else:
-                    logger.warning(f"下载OG图片失败: {image_url}")
+        if not force_refresh:
+            cache_path = self._get_cached_path(cache_key)
+            if cache_path:
+                logger.debug(f"使用缓存的OG图片: {url}")
+                return cache_path
+
+        # 同一URL已有进行中的获取时直接等待其结果
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            result = await self._fetch_og_image(url, cache_key, proxy_config)
+        except BaseException:
+            future.set_result(None)
+            raise
+        finally:
+            self._inflight.pop(cache_key, None)
+        future.set_result(result)
+        return result
+
+    async def _fetch_og_image(self, url: str, cache_key: str, proxy_config: Optional[Dict]) -> Optional[str]:
+        """抓取网页并下载、缓存OG图片"""
+        current_time = time.time()
+        try:
+            session = await self._get_session()
+            proxy_url = self._get_proxy_url(proxy_config)
+            async with session.get(url, proxy=proxy_url) as response:
+                if response.status != 200:
+                    logger.warning(f"获取网页失败, 状态码: {response.status}")
                     return None
-            except Exception as e:
-                logger.error(f"获取OG图片异常: {e}")
+
+                html_content = await self._read_html(response)
+
+            image_url = await self._extract_og_image_from_html(html_content, url)
+            if not image_url:
+                logger.info(f"未找到OG图片: {url}")
+                return None
+            cache_path = self._cache_path(cache_key)  # 保存为jpg
+            file_size = await self._download_image(image_url, cache_path, proxy_config)
+            if file_size:
+                resized_size = await asyncio.to_thread(self._resize_image, cache_path)
+                cache_info = {
+                    "url": url,
+                    "image_url": image_url,
+                    "cache_path": cache_path,
+                    "timestamp": current_time,
+                    "file_size": resized_size or file_size,
+                    "last_access": next(self._tick),
+                }
+                evicted_keys = []
+                with self.cache_lock:
+                    old_info = self.image_cache.get(cache_key)
+                    if old_info:
+                        self._total_size -= old_info.get("file_size", 0)
+                    self.image_cache[cache_key] = cache_info
+                    self._total_size += cache_info["file_size"]
+                    self._push_timestamp(cache_key, current_time)
+                    excess = len(self.image_cache) - MAX_CACHE_ENTRIES
+                    victims = (
+                        heapq.nsmallest(excess, self.image_cache.items(), key=lambda kv: kv[1]["last_access"])
+                        if excess > 0
+                        else []
+                    )
+                    for oldest_key, oldest_info in victims:
+                        del self.image_cache[oldest_key]
+                        self._total_size -= oldest_info.get("file_size", 0)
+                        evicted_keys.append(oldest_key)
+                        old_path = oldest_info.get("cache_path")
+                        if old_path and os.path.exists(old_path):
+                            try:
+                                os.remove(old_path)
+                            except:
+                                pass
+                    with self._transaction():
+                        self._persist_cache_entry(cache_key, cache_info)
+                        self._delete_cache_entries(evicted_keys)
+                logger.info(f"OG图片获取成功: {url} -> {cache_path}")
+                return cache_path
+            else:
+                logger.warning(f"下载OG图片失败: {image_url}")
                 return None
+        except Exception as e:
+            logger.error(f"获取OG图片异常: {e}")
+            return None
 
     def clear_url_cache(self, url: str):
         """清除指定URL的缓存"""
@@ -298,6 +590,8 @@ class OGImageManager:
         with self.cache_lock:
             if cache_key in self.image_cache:
                 cache_info = self.image_cache.pop(cache_key)
+                self._total_size -= cache_info.get("file_size", 0)
+                self._delete_cache_entries([cache_key])
                 cache_path = cache_info.get("cache_path")
 
                 if cache_path and os.path.exists(cache_path):
@@ -309,39 +603,49 @@ class OGImageManager:
 
     def clean_expired_cache(self) -> int:
         """清理过期缓存"""
-        current_time = time.time()
+        cutoff = time.time() - self.image_cache_days * 24 * 3600
         expired_keys = []
+        expired_paths = []
         with self.cache_lock:
-            for key, info in self.image_cache.items():
-                cache_time = info.get("timestamp", 0)
-                if (current_time - cache_time) > (self.image_cache_days * 24 * 3600):
-                    expired_keys.append(key)
-            # 删除过期缓存
-            for key in expired_keys:
-                cache_info = self.image_cache.pop(key, {})
-                cache_path = cache_info.get("cache_path")
-                if cache_path and os.path.exists(cache_path):
-                    try:
-                        os.remove(cache_path)
-                    except Exception as e:
-                        logger.error(f"删除过期缓存文件失败: {e}")
+            # 按时间戳从旧到新弹出, 遇到未过期条目即停止
+            while self._ts_heap and self._ts_heap[0][0] < cutoff:
+                cache_time, key = heapq.heappop(self._ts_heap)
+                cache_info = self.image_cache.get(key)
+                # 条目已被覆盖或移除时跳过
+                if not cache_info or cache_info.get("timestamp", 0) != cache_time:
+                    continue
+                del self.image_cache[key]
+                self._total_size -= cache_info.get("file_size", 0)
+                expired_keys.append(key)
+                expired_paths.append(cache_info.get("cache_path"))
+            self._delete_cache_entries(expired_keys)
+        # 删除过期缓存
+        for cache_path in expired_paths:
+            if cache_path and os.path.exists(cache_path):
+                try:
+                    os.remove(cache_path)
+                except Exception as e:
+                    logger.error(f"删除过期缓存文件失败: {e}")
         if expired_keys:
-            try:
-                loop = asyncio.get_event_loop()
-                loop.create_task(self._save_image_cache())
-            except:
-                pass
-
             logger.info(f"清理过期OG图片缓存: {len(expired_keys)}个")
 
         return len(expired_keys)
 
+    def _push_timestamp(self, cache_key: str, cache_time: float):
+        """记录条目时间戳, 失效记录过多时重建堆"""
+        heapq.heappush(self._ts_heap, (cache_time, cache_key))
+        if len(self._ts_heap) > 2 * len(self.image_cache) + 64:
+            self._rebuild_ts_heap()
+
+    def _rebuild_ts_heap(self):
+        """根据当前缓存重建时间戳堆"""
+        self._ts_heap = [(info.get("timestamp", 0), key) for key, info in self.image_cache.items()]
+        heapq.heapify(self._ts_heap)
+
     def get_cache_stats(self) -> Dict[str, Any]:
         """获取缓存统计信息"""
         with self.cache_lock:
-            total_size = 0
-            for info in self.image_cache.values():
-                total_size += info.get("file_size", 0)
+            total_size = self._total_size
             return {
                 "total_items": len(self.image_cache),
                 "total_size_bytes": total_size,
@@ -362,9 +666,9 @@ def get_og_manager(cache_dir: str, image_cache_days: int = 4) -> OGImageManager:
     return _og_manager
 
 
-def cleanup_og_manager():
+async def cleanup_og_manager():
     """清理OG图片管理器资源"""
     global _og_manager
     if _og_manager:
-        # 没啥用嗯...
+        await _og_manager.close()
         _og_manager = None
@@ -2,14 +2,26 @@
 两层权限管理系统
 """
 
+import ast
+import asyncio
 import json
+import os
+import re
 import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 from enum import Enum
 
 from loguru import logger
 
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    # 未安装orjson时回退到标准库json
+    ORJSON_AVAILABLE = False
+
 
 class QQPermissionLevel(Enum):
     """QQ层权限级别枚举"""
@@ -25,6 +37,48 @@ class GitHubPermissionLevel(Enum):
     WRITE = "write"  # 允许完整使用AI聊天功能和MCP工具
 
 
+# .env中的超级用户配置行
+_SUPERUSERS_RE = re.compile(r"^\s*SUPERUSERS\s*=\s*(.+?)\s*$")
+
+# 需要写入权限的MCP操作
+_MCP_WRITE_OPS = frozenset(
+    {
+        "create_issue",
+        "update_issue",
+        "close_issue",
+        "create_pull_request",
+        "update_pull_request",
+        "merge_pull_request",
+        "add_comment",
+        "update_comment",
+        "delete_comment",
+        "create_label",
+    }
+)
+
+# 权限配置写入合并延迟(秒), 期间的多次修改只写一次文件
+SAVE_DEBOUNCE_DELAY = 0.2
+
+# 有效权限缓存最大条目数
+EFFECTIVE_CACHE_SIZE = 1024
+
+# 权限字符串到枚举的映射, 避免每次调用Enum构造
+_QQ_BY_VALUE = {level.value: level for level in QQPermissionLevel}
+_GH_BY_VALUE = {level.value: level for level in GitHubPermissionLevel}
+
+# 权限级别高低顺序
+_QQ_LEVEL = {
+    QQPermissionLevel.NONE: 0,
+    QQPermissionLevel.READ: 1,
+    QQPermissionLevel.WRITE: 2,
+    QQPermissionLevel.SU: 3,
+}
+_GH_LEVEL = {
+    GitHubPermissionLevel.NONE: 0,
+    GitHubPermissionLevel.WRITE: 1,
+}
+
+
 class SimplifiedPermissionManager:
     """简化的两层权限管理器"""
 
@@ -34,40 +88,56 @@ class SimplifiedPermissionManager:
             "qq_permissions": {},  # QQ用户权限 {qq_id: permission_level}
             "github_permissions": {},  # GitHub用户权限 {github_username: permission_level}
             "qq_github_mapping": {},  # QQ到GitHub的映射 {qq_id: github_username}
-            "github_qq_mapping": {},  # GitHub到QQ的映射 {github_username: [qq_ids]}
+            "github_qq_mapping": {},  # GitHub到QQ的映射 {github_username: {qq_id: None}}, 按绑定顺序, 保存时转为列表
             "last_updated": time.time(),
         }
         self._superusers = self._load_superusers_from_env()
+        self._version = 0  # 权限数据版本号, 每次加载/修改后递增, 供下游缓存判断失效
+        self._dirty = False  # 是否有未写入文件的修改
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # 有效权限缓存 {qq_id: 权限级别}, 权限数据变更时清空
+        self._effective_cache: Dict[str, QQPermissionLevel] = {}
+        self._bind_tables()
         self._load_permissions()
 
+    def _bind_tables(self):
+        """将permissions_data中的各子表绑定为实例属性, 省去热路径上的键查找"""
+        self._qq_perms: Dict[str, str] = self.permissions_data["qq_permissions"]
+        self._gh_perms: Dict[str, str] = self.permissions_data["github_permissions"]
+        self._qq_to_gh: Dict[str, str] = self.permissions_data["qq_github_mapping"]
+        self._gh_to_qq: Dict[str, Dict[str, None]] = self.permissions_data["github_qq_mapping"]
+
     @property
     def superusers(self) -> List[str]:
         """获取超级用户列表"""
-        return self._superusers
+        return list(self._superusers)
+
+    @property
+    def version(self) -> int:
+        """权限数据版本号"""
+        return self._version
 
-    def _load_superusers_from_env(self) -> List[str]:
-        """从.env文件加载超级用户列表"""
+    def _load_superusers_from_env(self) -> FrozenSet[str]:
+        """从.env文件加载超级用户集合"""
         try:
             env_path = Path(__file__).parent.parent.parent.parent / ".env"
             if not env_path.exists():
                 logger.warning(f".env文件不存在: {env_path}")
-                return []
+                return frozenset()
 
             with open(env_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            for line in content.split("\n"):
-                if line.strip().startswith("SUPERUSERS="):
-                    superusers_str = line.split("=", 1)[1].strip()
-                    import ast
-                    superusers = ast.literal_eval(superusers_str)
-                    logger.success(f"从.env加载超级用户: {superusers}")
-                    return superusers
+                for line in f:
+                    match = _SUPERUSERS_RE.match(line)
+                    if match:
+                        superusers = ast.literal_eval(match.group(1))
+                        logger.success(f"从.env加载超级用户: {superusers}")
+                        return frozenset(superusers)
 
             logger.warning("未在.env文件中找到SUPERUSERS配置")
-            return []
+            return frozenset()
         except Exception as e:
             logger.error(f"加载超级用户配置失败: {e}")
-            return []
+            return frozenset()
 
     def _load_permissions(self):
         """加载权限配置"""
@@ -76,6 +146,11 @@ class SimplifiedPermissionManager:
                 with open(self.config_path, "r", encoding="utf-8") as f:
                     data = json.load(f)
                     self.permissions_data.update(data)
+                self._bind_tables()
+                for github_username, qq_ids in self._gh_to_qq.items():
+                    self._gh_to_qq[github_username] = dict.fromkeys(qq_ids)
+                self._effective_cache.clear()
+                self._version += 1
             else:
                 logger.info("权限配置文件不存在, 使用默认配置")
                 self._save_permissions()
@@ -83,15 +158,50 @@ class SimplifiedPermissionManager:
             logger.error(f"加载权限配置失败: {e}")
 
     def _save_permissions(self):
-        """保存权限配置"""
+        """保存权限配置(先写临时文件再替换, 避免写入中断导致文件损坏)"""
         try:
-            self.permissions_data["last_updated"] = time.time()
-            with open(self.config_path, "w", encoding="utf-8") as f:
-                json.dump(self.permissions_data, f, ensure_ascii=False, indent=2)
+            tmp_path = self.config_path.with_suffix(".json.tmp")
+            # 反向映射在内存中为有序字典, 序列化前按绑定顺序转为列表
+            payload = dict(self.permissions_data)
+            payload["github_qq_mapping"] = {
+                github_username: list(qq_ids) for github_username, qq_ids in self._gh_to_qq.items()
+            }
+            if ORJSON_AVAILABLE:
+                data = orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            else:
+                data = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.config_path)
             logger.debug("权限配置保存成功")
         except Exception as e:
             logger.error(f"保存权限配置失败: {e}")
 
+    def _mark_dirty(self):
+        """标记权限数据已修改, 在事件循环中延迟合并写入, 否则立即写入"""
+        self._version += 1
+        self._effective_cache.clear()
+        self.permissions_data["last_updated"] = time.time()
+        self._dirty = True
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flush_handle = loop.call_later(SAVE_DEBOUNCE_DELAY, self.flush)
+
+    def flush(self):
+        """立即写入未保存的修改"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._save_permissions()
+
     def is_superuser(self, qq_id: str) -> bool:
         """检查是否为超级用户"""
         return qq_id in self._superusers
@@ -101,12 +211,12 @@ class SimplifiedPermissionManager:
         # 超级用户自动获得SU权限
         if self.is_superuser(qq_id):
             return QQPermissionLevel.SU
-        permission_str = self.permissions_data["qq_permissions"].get(qq_id, "none")
-        try:
-            return QQPermissionLevel(permission_str)
-        except ValueError:
+        permission_str = self._qq_perms.get(qq_id, "none")
+        permission = _QQ_BY_VALUE.get(permission_str)
+        if permission is None:
             logger.warning(f"无效的QQ权限级别: {permission_str}, 使用默认权限")
             return QQPermissionLevel.NONE
+        return permission
 
     def set_qq_permission(self, qq_id: str, permission: QQPermissionLevel) -> bool:
         """设置QQ用户权限"""
@@ -114,8 +224,8 @@ class SimplifiedPermissionManager:
             if permission == QQPermissionLevel.SU:
                 return False
 
-            self.permissions_data["qq_permissions"][qq_id] = permission.value
-            self._save_permissions()
+            self._qq_perms[qq_id] = permission.value
+            self._mark_dirty()
             logger.info(f"设置QQ用户 {qq_id} 权限为: {permission.value}")
             return True
         except Exception as e:
@@ -125,9 +235,9 @@ class SimplifiedPermissionManager:
     def remove_qq_permission(self, qq_id: str) -> bool:
         """移除QQ用户权限(恢复为NONE)"""
         try:
-            if qq_id in self.permissions_data["qq_permissions"]:
-                del self.permissions_data["qq_permissions"][qq_id]
-                self._save_permissions()
+            if qq_id in self._qq_perms:
+                del self._qq_perms[qq_id]
+                self._mark_dirty()
                 logger.info(f"移除QQ用户 {qq_id} 的权限")
             return True
         except Exception as e:
@@ -135,48 +245,47 @@ class SimplifiedPermissionManager:
             return False
 
     def _get_effective_qq_permission(self, qq_id: str) -> QQPermissionLevel:
-        """获取有效的QQ权限(应用权限映射)"""
-        if qq_id == "ai_reviewer":
-            return QQPermissionLevel.READ
-
-        base_permission = self.get_qq_permission(qq_id)
-        if base_permission == QQPermissionLevel.NONE:
-            github_username = self.get_github_by_qq(qq_id)
-            if github_username:
-                logger.debug(f"用户 {qq_id} 绑定了GitHub {github_username}, None权限映射为Read权限")
-                return QQPermissionLevel.READ
+        """获取有效的QQ权限(应用权限映射), 结果缓存至权限数据下次变更"""
+        permission = self._effective_cache.get(qq_id)
+        if permission is not None:
+            return permission
 
-        return base_permission
+        if qq_id == "ai_reviewer":
+            permission = QQPermissionLevel.READ
+        else:
+            permission = self.get_qq_permission(qq_id)
+            if permission == QQPermissionLevel.NONE:
+                github_username = self.get_github_by_qq(qq_id)
+                if github_username:
+                    logger.debug(f"用户 {qq_id} 绑定了GitHub {github_username}, None权限映射为Read权限")
+                    permission = QQPermissionLevel.READ
+
+        if len(self._effective_cache) >= EFFECTIVE_CACHE_SIZE:
+            self._effective_cache.clear()
+        self._effective_cache[qq_id] = permission
+        return permission
 
     def has_qq_permission(self, qq_id: str, required_permission: QQPermissionLevel) -> bool:
         """检查QQ用户是否有指定权限(应用权限映射)"""
-        user_permission = self._get_effective_qq_permission(qq_id)
-        permission_hierarchy = {
-            QQPermissionLevel.NONE: 0,
-            QQPermissionLevel.READ: 1,
-            QQPermissionLevel.WRITE: 2,
-            QQPermissionLevel.SU: 3,
-        }
-
-        user_level = permission_hierarchy.get(user_permission, 0)
-        required_level = permission_hierarchy.get(required_permission, 0)
-
-        return user_level >= required_level
+        # 超级用户满足任何权限要求, 无需解析有效权限
+        if qq_id in self._superusers:
+            return True
+        return _QQ_LEVEL[self._get_effective_qq_permission(qq_id)] >= _QQ_LEVEL[required_permission]
 
     def get_github_permission(self, github_username: str) -> GitHubPermissionLevel:
         """获取GitHub用户权限级别"""
-        permission_str = self.permissions_data["github_permissions"].get(github_username, "none")
-        try:
-            return GitHubPermissionLevel(permission_str)
-        except ValueError:
+        permission_str = self._gh_perms.get(github_username, "none")
+        permission = _GH_BY_VALUE.get(permission_str)
+        if permission is None:
             logger.warning(f"无效的GitHub权限级别: {permission_str}")
             return GitHubPermissionLevel.NONE
+        return permission
 
     def set_github_permission(self, github_username: str, permission: GitHubPermissionLevel) -> bool:
         """设置GitHub用户权限"""
         try:
-            self.permissions_data["github_permissions"][github_username] = permission.value
-            self._save_permissions()
+            self._gh_perms[github_username] = permission.value
+            self._mark_dirty()
             logger.info(f"设置GitHub用户 {github_username} 权限为: {permission.value}")
             return True
         except Exception as e:
@@ -186,9 +295,9 @@ class SimplifiedPermissionManager:
     def remove_github_permission(self, github_username: str) -> bool:
         """移除GitHub用户权限"""
         try:
-            if github_username in self.permissions_data["github_permissions"]:
-                del self.permissions_data["github_permissions"][github_username]
-                self._save_permissions()
+            if github_username in self._gh_perms:
+                del self._gh_perms[github_username]
+                self._mark_dirty()
                 logger.info(f"移除GitHub用户 {github_username} 的权限")
             return True
         except Exception as e:
@@ -197,45 +306,37 @@ class SimplifiedPermissionManager:
 
     def has_github_permission(self, github_username: str, required_permission: GitHubPermissionLevel) -> bool:
         """检查GitHub用户权限"""
-        user_permission = self.get_github_permission(github_username)
-        permission_hierarchy = {
-            GitHubPermissionLevel.NONE: 0,
-            GitHubPermissionLevel.WRITE: 1,
-        }
-        user_level = permission_hierarchy.get(user_permission, 0)
-        required_level = permission_hierarchy.get(required_permission, 0)
-
-        return user_level >= required_level
+        return _GH_LEVEL[self.get_github_permission(github_username)] >= _GH_LEVEL[required_permission]
 
     def bind_qq_github(self, qq_id: str, github_username: str) -> bool:
         """绑定用户"""
         try:
-            self.permissions_data["qq_github_mapping"][qq_id] = github_username
-            if github_username not in self.permissions_data["github_qq_mapping"]:
-                self.permissions_data["github_qq_mapping"][github_username] = []
-            if qq_id not in self.permissions_data["github_qq_mapping"][github_username]:
-                self.permissions_data["github_qq_mapping"][github_username].append(qq_id)
-            self._save_permissions()
+            self._qq_to_gh[qq_id] = github_username
+            self._gh_to_qq.setdefault(github_username, {})[qq_id] = None
+            self._mark_dirty()
             logger.info(f"绑定用户: QQ {qq_id} <-> GitHub {github_username}")
             return True
         except Exception as e:
             logger.error(f"绑定用户失败: {e}")
             return False
 
+    def _remove_binding(self, qq_id: str) -> Optional[str]:
+        """移除QQ与GitHub的双向映射(不保存), 返回原绑定的GitHub用户名"""
+        github_username = self._qq_to_gh.pop(qq_id, None)
+        if github_username:
+            qq_ids = self._gh_to_qq.get(github_username)
+            if qq_ids is not None:
+                qq_ids.pop(qq_id, None)
+                if not qq_ids:
+                    del self._gh_to_qq[github_username]
+        return github_username
+
     def unbind_qq_github(self, qq_id: str) -> bool:
         """解绑QQ用户和GitHub用户"""
         try:
-            github_username = self.permissions_data["qq_github_mapping"].get(qq_id)
+            github_username = self._remove_binding(qq_id)
             if github_username:
-                del self.permissions_data["qq_github_mapping"][qq_id]
-                if github_username in self.permissions_data["github_qq_mapping"]:
-                    qq_list = self.permissions_data["github_qq_mapping"][github_username]
-                    if qq_id in qq_list:
-                        qq_list.remove(qq_id)
-                    if not qq_list:
-                        del self.permissions_data["github_qq_mapping"][github_username]
-
-                self._save_permissions()
+                self._mark_dirty()
                 logger.info(f"解绑用户: QQ {qq_id} <-> GitHub {github_username}")
             return True
         except Exception as e:
@@ -244,11 +345,11 @@ class SimplifiedPermissionManager:
 
     def get_github_by_qq(self, qq_id: str) -> Optional[str]:
         """通过QQ号获取GitHub用户名"""
-        return self.permissions_data["qq_github_mapping"].get(qq_id)
+        return self._qq_to_gh.get(qq_id)
 
-    def get_qq_by_github(self, github_username: str) -> List[str]:
-        """通过GitHub用户名获取QQ号列表"""
-        return self.permissions_data["github_qq_mapping"].get(github_username, [])
+    def get_qq_by_github(self, github_username: str) -> Tuple[str, ...]:
+        """通过GitHub用户名获取绑定的QQ号(只读)"""
+        return tuple(self._gh_to_qq.get(github_username, ()))
 
     def check_mcp_write_permission(self, qq_id: str, operation: str) -> bool:
         """检查MCP写入操作权限
@@ -260,23 +361,10 @@ class SimplifiedPermissionManager:
         Returns:
             是否有权限执行该操作
         """
-        write_operations = {
-            "create_issue",
-            "update_issue",
-            "close_issue",
-            "create_pull_request",
-            "update_pull_request",
-            "merge_pull_request",
-            "add_comment",
-            "update_comment",
-            "delete_comment",
-            "create_label",
-        }
-
-        if operation not in write_operations:
+        if operation not in _MCP_WRITE_OPS:
             return True
         qq_permission = self._get_effective_qq_permission(qq_id)
-        if qq_permission in [QQPermissionLevel.WRITE, QQPermissionLevel.SU]:
+        if qq_permission in (QQPermissionLevel.WRITE, QQPermissionLevel.SU):
             return True
         github_username = self.get_github_by_qq(qq_id)
         if github_username:
@@ -327,6 +415,50 @@ class SimplifiedPermissionManager:
             logger.error(f"无效的操作: {action}")
             return False
 
+    def bind_and_grant(
+        self, operator_qq_id: str, qq_id: str, github_username: str, permission: QQPermissionLevel
+    ) -> bool:
+        """绑定GitHub账户并设置QQ权限(仅SU), 只保存一次"""
+        if not self.has_qq_permission(operator_qq_id, QQPermissionLevel.SU):
+            logger.warning(f"用户 {operator_qq_id} 无权限管理用户绑定")
+            return False
+        if permission == QQPermissionLevel.SU:
+            return False
+
+        try:
+            # 已绑定其他GitHub账户时先移除旧的反向映射
+            if self._qq_to_gh.get(qq_id) != github_username:
+                self._remove_binding(qq_id)
+            self._qq_to_gh[qq_id] = github_username
+            self._gh_to_qq.setdefault(github_username, {})[qq_id] = None
+            self._qq_perms[qq_id] = permission.value
+            self._mark_dirty()
+            logger.info(f"绑定用户: QQ {qq_id} <-> GitHub {github_username}, 权限: {permission.value}")
+            return True
+        except Exception as e:
+            logger.error(f"绑定用户失败: {e}")
+            return False
+
+    def unbind_and_revoke(self, operator_qq_id: str, qq_id: str) -> Tuple[bool, Optional[str]]:
+        """解绑GitHub账户并将QQ权限重置为NONE(仅SU), 只保存一次
+
+        Returns:
+            (是否成功, 原绑定的GitHub用户名)
+        """
+        if not self.has_qq_permission(operator_qq_id, QQPermissionLevel.SU):
+            logger.warning(f"用户 {operator_qq_id} 无权限管理用户绑定")
+            return False, None
+
+        try:
+            github_username = self._remove_binding(qq_id)
+            self._qq_perms[qq_id] = QQPermissionLevel.NONE.value
+            self._mark_dirty()
+            logger.info(f"解绑并移除权限: QQ {qq_id} <-> GitHub {github_username}")
+            return True, github_username
+        except Exception as e:
+            logger.error(f"解绑用户失败: {e}")
+            return False, None
+
     def get_user_info(self, qq_id: str) -> Dict[str, Any]:
         """获取用户完整信息"""
         qq_permission = self.get_qq_permission(qq_id)
@@ -346,31 +478,64 @@ class SimplifiedPermissionManager:
         }
 
     def get_all_users(self) -> Dict[str, List[Dict[str, Any]]]:
-        """获取所有用户信息(仅SU)"""
+        """获取所有用户信息(仅SU), 单次遍历内存数据, 结果与逐个get_user_info一致"""
+        qq_permissions = self._qq_perms
+        github_permissions = self._gh_perms
+        qq_github_mapping = self._qq_to_gh
+        github_qq_mapping = self._gh_to_qq
+        superusers = self._superusers
+        none_value = QQPermissionLevel.NONE.value
+        read_value = QQPermissionLevel.READ.value
+
         qq_users = []
-        github_users = []
-        all_qq_ids = set(self.permissions_data["qq_permissions"].keys()) | set(self._superusers)
-        for qq_id in all_qq_ids:
-            qq_users.append(self.get_user_info(qq_id))
-        for github_username, permission in self.permissions_data["github_permissions"].items():
-            bound_qq_ids = self.get_qq_by_github(github_username)
-            github_users.append(
+        for qq_id in qq_permissions.keys() | superusers:
+            is_superuser = qq_id in superusers
+            if is_superuser:
+                qq_permission = QQPermissionLevel.SU.value
+            else:
+                qq_permission = qq_permissions.get(qq_id, none_value)
+                if qq_permission not in _QQ_BY_VALUE:
+                    qq_permission = none_value
+            github_username = qq_github_mapping.get(qq_id)
+            github_permission = None
+            if github_username:
+                github_permission = github_permissions.get(github_username, GitHubPermissionLevel.NONE.value)
+                if github_permission not in _GH_BY_VALUE:
+                    github_permission = GitHubPermissionLevel.NONE.value
+            # 有效权限: 同 _get_effective_qq_permission
+            if qq_id == "ai_reviewer" or (qq_permission == none_value and github_username):
+                effective_qq_permission = read_value
+            else:
+                effective_qq_permission = qq_permission
+            qq_users.append(
                 {
+                    "qq_id": qq_id,
+                    "qq_permission": qq_permission,
+                    "effective_qq_permission": effective_qq_permission,
+                    "is_superuser": is_superuser,
                     "github_username": github_username,
-                    "github_permission": permission,
-                    "bound_qq_ids": bound_qq_ids,
+                    "github_permission": github_permission,
                 }
             )
 
+        github_users = [
+            {
+                "github_username": github_username,
+                "github_permission": permission,
+                "bound_qq_ids": list(github_qq_mapping.get(github_username, ())),
+            }
+            for github_username, permission in github_permissions.items()
+        ]
+
         return {"qq_users": qq_users, "github_users": github_users}
 
     def get_stats(self) -> Dict[str, Any]:
         """获取权限系统统计信息"""
         return {
-            "total_qq_users": len(self.permissions_data["qq_permissions"]),
-            "total_github_users": len(self.permissions_data["github_permissions"]),
+            "total_qq_users": len(self._qq_perms),
+            "total_github_users": len(self._gh_perms),
             "total_superusers": len(self._superusers),
-            "total_bindings": len(self.permissions_data["qq_github_mapping"]),
+            "total_bindings": len(self._qq_to_gh),
             "last_updated": self.permissions_data["last_updated"],
         }
 
@@ -387,6 +552,12 @@ def get_permission_manager() -> SimplifiedPermissionManager:
     return _permission_manager
 
 
+def cleanup_permission_manager():
+    """清理权限管理器资源(写入未保存的修改)"""
+    if _permission_manager:
+        _permission_manager.flush()
+
+
 # 我服了爸爸。
 UnifiedPermissionManager = SimplifiedPermissionManager
 PermissionLevel = QQPermissionLevel
@@ -2,12 +2,56 @@
 提示词引擎on jinja2
 """
 
+import asyncio
 import json
+import os
+import re
+import time
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader, Template, TemplateNotFound
-from .ai_models import ContextType, ConversationContext
+from jinja2 import Environment, FileSystemLoader, Template, TemplateNotFound, TemplateSyntaxError
+from loguru import logger
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    # 未安装orjson时回退到标准库json
+    ORJSON_AVAILABLE = False
+
+from .ai_models import ContextType, ConversationContext, make_context_key
+
+# @提及格式
+_MENTION_RE = re.compile(r"@([\w-]+)")
+# Jinja模板缓存容量
+TEMPLATE_CACHE_SIZE = 400
+# 系统提示词基础模板
+SYSTEM_TEMPLATE_NAME = "system.j2"
+# 上下文类型对应的追加模板
+_CONTEXT_TEMPLATE_MAP: Dict[ContextType, str] = {
+    ContextType.QQ_GROUP: "qq_group.j2",
+    ContextType.QQ_PRIVATE: "qq_private.j2",
+    ContextType.GITHUB_PR: "github_pr.j2",
+    ContextType.GITHUB_ISSUE: "github_issue.j2",
+    ContextType.GITHUB_COMMENT: "github_comment.j2",
+}
+
+# 提示词配置写入合并延迟(秒)
+CONFIG_SAVE_DELAY = 1.0
+
+# 当前时间字符串缓存 (秒级时间戳, 格式化结果)
+_now_cache: Tuple[int, str] = (0, "")
+
+
+def _now_str() -> str:
+    """当前时间字符串, 同一秒内复用格式化结果"""
+    global _now_cache
+    second = int(time.time())
+    if _now_cache[0] != second:
+        _now_cache = (second, datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S"))
+    return _now_cache[1]
 
 
 class PromptEngine:
@@ -20,23 +64,46 @@ class PromptEngine:
             autoescape=False,
             trim_blocks=True,
             lstrip_blocks=True,
+            cache_size=TEMPLATE_CACHE_SIZE,
+            # 模板只在create_template/reload_templates时变化, 取模板时无需检查文件修改时间
+            auto_reload=False,
         )
         self.env.filters["truncate_smart"] = self._truncate_smart
         self.env.filters["format_datetime"] = self._format_datetime
         self.env.filters["extract_mentions"] = self._extract_mentions
-        self._template_cache: Dict[str, Template] = {}
         self.templates_dir.mkdir(parents=True, exist_ok=True)
+        self._prime_templates()
+
+    def _prime_templates(self):
+        """预编译模板目录下的全部模板, 并绑定系统/上下文模板"""
+        compiled: Dict[str, Template] = {}
+        for template_name in self.list_templates():
+            # 单个模板语法错误只跳过该模板, 不影响引擎初始化
+            try:
+                template = self._find_template(template_name)
+            except TemplateSyntaxError as e:
+                logger.error("模板语法错误, 已跳过: {} ({})", template_name, e)
+                continue
+            if template is not None:
+                compiled[template_name] = template
+        self._bind_prompt_templates(compiled)
+
+    def _bind_prompt_templates(self, compiled: Dict[str, Template]):
+        """按上下文类型绑定已编译的模板, 缺失或编译失败的模板为None"""
+        self._system_template = compiled.get(SYSTEM_TEMPLATE_NAME)
+        self._context_templates: Dict[ContextType, Optional[Template]] = {
+            context_type: compiled.get(name) for context_type, name in _CONTEXT_TEMPLATE_MAP.items()
+        }
 
     def _truncate_smart(self, text: str, length: int = 100, suffix: str = "...") -> str:
         """截断文本"""
         if len(text) <= length:
             return text
-        truncated = text[:length]
-        last_space = truncated.rfind(" ")
-        if last_space > length * 0.8:  # 如果空格位置合理
-            truncated = truncated[:last_space]
-
-        return truncated + suffix
+        # 只在后20%范围内查找空格, 找到则在空格处截断
+        last_space = text.rfind(" ", int(length * 0.8) + 1, length)
+        if last_space < 0:
+            return text[:length] + suffix
+        return text[:last_space] + suffix
 
     def _format_datetime(self, dt: datetime, format_str: str = "%Y-%m-%d %H:%M:%S") -> str:
         """格式化日期时间"""
@@ -49,48 +116,37 @@ class PromptEngine:
 
     def _extract_mentions(self, text: str) -> List[str]:
         """提取@提及"""
-        import re
-        return re.findall(r"@([\w-]+)", text)
+        return _MENTION_RE.findall(text)
 
     def get_template(self, template_name: str) -> Optional[Template]:
         """获取模板"""
-        if template_name in self._template_cache:
-            return self._template_cache[template_name]
+        template = self._find_template(template_name)
+        if template is None:
+            logger.warning("模板未找到: {}", template_name)
+        return template
 
+    def _find_template(self, template_name: str) -> Optional[Template]:
+        """从Jinja缓存获取模板, 未缓存时编译, 不存在时返回None"""
         try:
-            template = self.env.get_template(template_name)
-            self._template_cache[template_name] = template
-            return template
+            return self.env.get_template(template_name)
         except TemplateNotFound:
-            print(f"模板未找到: {template_name}")
             return None
 
     def render_system_prompt(self, context: ConversationContext, **kwargs) -> str:
         """渲染系统提示词"""
-        # 根据上下文类型选择模板
-        template_map = {
-            ContextType.QQ_GROUP: "qq_group.j2",
-            ContextType.QQ_PRIVATE: "qq_private.j2",
-            ContextType.GITHUB_PR: "github_pr.j2",
-            ContextType.GITHUB_ISSUE: "github_issue.j2",
-            ContextType.GITHUB_COMMENT: "github_comment.j2",
-        }
-
-        # 基础系统模板
-        system_template = self.get_template("system.j2")
-        context_template_name = template_map.get(context.context_type)
-        context_template = None
-        if context_template_name:
-            context_template = self.get_template(context_template_name)
-        # 准备模板变量
+        # 基础系统模板及上下文类型对应模板(预先绑定)
+        system_template = self._system_template
+        context_template = self._context_templates.get(context.context_type)
+        if system_template is None and context_template is None:
+            return ""
+        # 准备模板变量, 直接传入映射, 避免每次渲染展开关键字参数
         template_vars = self._prepare_template_vars(context, **kwargs)
-        system_prompt = system_template.render(**template_vars)
-        # 如果有上下文特定模板, 追加渲染
-        if context_template:
-            context_prompt = context_template.render(**template_vars)
-            system_prompt = f"{system_prompt}\n\n{context_prompt}"
-
-        return system_prompt
+        if context_template is None:
+            return system_template.render(template_vars)
+        if system_template is None:
+            return context_template.render(template_vars)
+        # 有上下文特定模板时追加渲染
+        return "\n\n".join((system_template.render(template_vars), context_template.render(template_vars)))
 
     def render_custom_prompt(self, template_name: str, **kwargs) -> str:
         """渲染自定义提示词"""
@@ -102,17 +158,18 @@ class PromptEngine:
 
     def _prepare_template_vars(self, context: ConversationContext, **kwargs) -> Dict[str, Any]:
         """准备模板变量"""
+        message_count, conversation_history, recent_messages = context.render_snapshot(5)
         vars_dict = {
-            "current_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "context_type": context.context_type.value,
+            "current_time": _now_str(),
+            "context_type": context.context_type_value,
             "context_id": context.context_id,
             "repository": context.repository,
             "issue_or_pr_id": context.issue_or_pr_id,
             "group_id": context.group_id,
             "user_id": context.user_id,
-            "message_count": context.get_message_count(),
-            "conversation_history": context.get_context_summary(),
-            "recent_messages": context.get_recent_messages(5),
+            "message_count": message_count,
+            "conversation_history": conversation_history,
+            "recent_messages": recent_messages,
             "metadata": context.metadata,
         }
 
@@ -122,40 +179,48 @@ class PromptEngine:
 
     def create_template(self, template_name: str, content: str) -> bool:
         """创建新模板"""
+        try:
+            # 先检查语法, 避免把无法编译的模板写入目录
+            self.env.parse(content, template_name)
+        except TemplateSyntaxError as e:
+            logger.error("创建模板失败, 模板语法错误: {} ({})", template_name, e)
+            return False
         try:
             template_path = self.templates_dir / template_name
             with open(template_path, "w", encoding="utf-8") as f:
                 f.write(content)
-            if template_name in self._template_cache:
-                del self._template_cache[template_name]
+            # 未开启auto_reload, 需重新加载才能使用新内容
+            self.reload_templates()
 
             return True
         except Exception as e:
-            print(f"创建模板失败: {e}")
+            logger.error("创建模板失败: {}", e)
             return False
 
     def list_templates(self) -> List[str]:
         """列出所有模板"""
         try:
-            return [f.name for f in self.templates_dir.glob("*.j2")]
+            with os.scandir(self.templates_dir) as entries:
+                return [entry.name for entry in entries if entry.name.endswith(".j2") and entry.is_file()]
         except Exception:
             return []
 
     def validate_template(self, template_name: str) -> tuple[bool, Optional[str]]:
-        """验证模板语法"""
+        """验证模板语法(只解析不渲染)"""
         try:
-            template = self.get_template(template_name)
-            if not template:
-                return False, "模板未找到"
-            template.render()
+            source = self.env.loader.get_source(self.env, template_name)[0]
+            self.env.parse(source, template_name)
             return True, None
+        except TemplateNotFound:
+            return False, "模板未找到"
         except Exception as e:
             return False, str(e)
 
     def reload_templates(self):
         """重新加载所有模板"""
-        self._template_cache.clear()
-        # Jinja2会自动重新加载模板文件
+        if self.env.cache is not None:
+            self.env.cache.clear()
+        self._prime_templates()
 
 
 class PromptManager:
@@ -164,6 +229,10 @@ class PromptManager:
     def __init__(self, templates_dir: str):
         self.engine = PromptEngine(templates_dir)
         self.prompt_configs: Dict[str, Dict[str, Any]] = {}
+        # 自定义模板索引 {context_key: template_name}, 由prompt_configs派生
+        self._custom_templates: Dict[str, str] = {}
+        self._dirty = False  # 是否有未写入文件的修改
+        self._save_handle: Optional[asyncio.TimerHandle] = None
         self._load_prompt_configs()
 
     def _load_prompt_configs(self):
@@ -171,45 +240,82 @@ class PromptManager:
         config_file = Path(self.engine.templates_dir) / "config.json"
         if config_file.exists():
             try:
-                with open(config_file, "r", encoding="utf-8") as f:
-                    self.prompt_configs = json.load(f)
+                if ORJSON_AVAILABLE:
+                    self.prompt_configs = orjson.loads(config_file.read_bytes())
+                else:
+                    with open(config_file, "r", encoding="utf-8") as f:
+                        self.prompt_configs = json.load(f)
             except Exception as e:
-                print(f"加载提示词配置失败: {e}")
+                logger.error("加载提示词配置失败: {}", e)
+        self._custom_templates = {
+            context_key: config["custom_template"]
+            for context_key, config in self.prompt_configs.items()
+            if isinstance(config, dict) and "custom_template" in config
+        }
 
     def save_prompt_configs(self):
-        """保存提示词配置"""
+        """保存提示词配置(先写临时文件再替换, 避免写入中断导致文件损坏)"""
         config_file = Path(self.engine.templates_dir) / "config.json"
         try:
-            with open(config_file, "w", encoding="utf-8") as f:
-                json.dump(self.prompt_configs, f, ensure_ascii=False, indent=2)
+            if ORJSON_AVAILABLE:
+                data = orjson.dumps(self.prompt_configs, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            else:
+                data = json.dumps(self.prompt_configs, ensure_ascii=False, indent=2).encode("utf-8")
+            tmp_file = config_file.with_suffix(".json.tmp")
+            tmp_file.write_bytes(data)
+            os.replace(tmp_file, config_file)
         except Exception as e:
-            print(f"保存提示词配置失败: {e}")
+            logger.error("保存提示词配置失败: {}", e)
+
+    def _mark_dirty(self):
+        """标记配置已修改, 在事件循环中延迟合并写入, 否则立即写入"""
+        self._dirty = True
+        if self._save_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._save_handle = loop.call_later(CONFIG_SAVE_DELAY, self.flush)
+
+    def flush(self):
+        """立即写入未保存的配置"""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        if not self._dirty:
+            return
+        self._dirty = False
+        self.save_prompt_configs()
 
     def get_prompt_for_context(self, context: ConversationContext, **kwargs) -> str:
         """为特定上下文获取提示词"""
-        # 检查是否有自定义配置
-        context_key = f"{context.context_type.value}_{context.context_id}"
-        if context_key in self.prompt_configs:
-            config = self.prompt_configs[context_key]
-            if "custom_template" in config:
-                return self.engine.render_custom_prompt(config["custom_template"], **kwargs)
+        # 检查是否有自定义模板(未配置任何自定义模板时跳过查找)
+        custom_templates = self._custom_templates
+        if custom_templates:
+            template_name = custom_templates.get(context.cache_key)
+            if template_name:
+                return self.engine.render_custom_prompt(template_name, **kwargs)
         return self.engine.render_system_prompt(context, **kwargs)
 
     def set_custom_prompt(self, context_id: str, context_type: ContextType, template_name: str):
         """为特定上下文设置自定义提示词"""
-        context_key = f"{context_type.value}_{context_id}"
+        context_key = make_context_key(context_type.value, context_id)
         self.prompt_configs[context_key] = {
             "custom_template": template_name,
             "created_at": datetime.now().isoformat(),
         }
-        self.save_prompt_configs()
+        self._custom_templates[context_key] = template_name
+        self._mark_dirty()
 
     def remove_custom_prompt(self, context_id: str, context_type: ContextType):
         """移除自定义提示词配置"""
-        context_key = f"{context_type.value}_{context_id}"
+        context_key = make_context_key(context_type.value, context_id)
         if context_key in self.prompt_configs:
             del self.prompt_configs[context_key]
-            self.save_prompt_configs()
+            self._custom_templates.pop(context_key, None)
+            self._mark_dirty()
 
     def create_prompt_template(self, name: str, content: str) -> bool:
         """创建提示词模板"""
@@ -244,6 +350,8 @@ def get_prompt_manager(templates_dir: str = None) -> PromptManager:
 
 
 def cleanup_prompt_manager():
-    """清理提示词管理器"""
+    """清理提示词管理器(写入未保存的配置)"""
     global _prompt_manager
+    if _prompt_manager:
+        _prompt_manager.flush()
     _prompt_manager = None
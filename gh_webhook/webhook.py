@@ -86,6 +86,7 @@ class WebhookProcessor:
         self.processing_task = None
         self.is_processing = False
         self.active_reviews = set()  # 正在进行的审查: {"repo/name#pr_number"}
+        self._bg_tasks = set()  # 后台任务引用, 防止未完成时被回收
         self.review_cache_max_size = 100
         # 支持的类型
         self.supported_events = {
@@ -129,7 +130,7 @@ class WebhookProcessor:
                     logger.error(f"MCP工具实例创建失败: {e}")
 
             self.unified_ai_handler.set_dependencies(github_processor, mcp_tools=mcp_tools)
-            asyncio.create_task(self._initialize_unified_ai())
+            self._spawn_background(self._initialize_unified_ai())
 
         logger.success("事件处理器依赖模块已设置")
 
@@ -169,6 +170,19 @@ class WebhookProcessor:
         self.is_processing = True
         self.processing_task = asyncio.create_task(self._process_event_queue())
 
+    def _spawn_background(self, coro) -> Optional[asyncio.Task]:
+        """启动后台任务并保持引用直到完成"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.warning("没有运行中的事件循环, 跳过后台任务")
+            coro.close()
+            return None
+        task = loop.create_task(coro)
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
+        return task
+
     async def stop_processing(self):
         """停止处理事件队列"""
         if not self.is_processing:
@@ -459,7 +473,9 @@ class WebhookProcessor:
 
             # event.payload包含嵌套的payload结构
             actual_payload = event.payload.get("payload", event.payload)
-            message_request = self.msg_processor.create_message_request(message_type, actual_payload, event.repository)
+            message_request = await self.msg_processor.create_message_request(
+                message_type, actual_payload, event.repository
+            )
             if message_request:
                 return await self.msg_processor.process_message_request(message_request)
 
@@ -541,7 +557,7 @@ class WebhookProcessor:
                             for _ in range(excess):
                                 self.active_reviews.pop()
 
-                        asyncio.create_task(self._perform_ai_review(event.repository, pr_number, pr))
+                        self._spawn_background(self._perform_ai_review(event.repository, pr_number, pr))
                         logger.info(f"🤖 {bot_username} 被请求审核 PR {event.repository}#{pr_number}, 启动审查")
                     else:
                         logger.warning(f"MCP工具未就绪, 无法启动AI审核: {event.repository}#{pr_number}")
@@ -700,7 +716,7 @@ class WebhookProcessor:
                                 "pull_request": pr_data,
                                 "review_result": review_data
                             }
-                            message_request = self.msg_processor.create_message_request(
+                            message_request = await self.msg_processor.create_message_request(
                                 MessageType.AI_REVIEW, ai_review_payload, repository
                             )
                             if message_request:
@@ -795,6 +811,10 @@ class WebhookProcessor:
     async def cleanup(self):
         """清理资源"""
         await self.stop_processing()
+        for task in list(self._bg_tasks):
+            task.cancel()
+        if self._bg_tasks:
+            await asyncio.gather(*self._bg_tasks, return_exceptions=True)
         self.delivery_cache.clear()
         self.event_stats.clear()
         while not self.event_queue.empty():